@@ -0,0 +1,74 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.http import HttpResponse
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.ASYNC_READ_WORKERS,
+            thread_name_prefix='api-read'
+        )
+    return _executor
+
+
+def render_response(view, request, *args, **kwargs):
+    """Выполняет синхронное представление и отрисовывает ответ в потоке.
+
+    Потоковый ответ собирается целиком, чтобы обработчик ASGI не
+    обращался к БД и не формировал PDF в цикле событий. Запросы к БД идут
+    через соединение этого потока, поэтому счетчик запросов и время
+    отрисовки для InstrumentationMiddleware замеряются здесь.
+    """
+    recorder = getattr(request, '_query_recorder', None)
+    close_old_connections()
+    try:
+        with (connection.execute_wrapper(recorder) if recorder is not None
+              else nullcontext()):
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render') and callable(response.render):
+                started = time.perf_counter()
+                response.render()
+                if hasattr(request, '_render_seconds'):
+                    request._render_seconds = time.perf_counter() - started
+            content = (
+                b''.join(response.streaming_content) if response.streaming
+                else response.content
+            )
+        rendered = HttpResponse(content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        return rendered
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Асинхронная обертка над представлением DRF для запуска под ASGI.
+
+    Запросы на чтение выполняются в отдельном пуле из
+    ASYNC_READ_WORKERS потоков, поэтому медленный запрос к БД не
+    блокирует остальные. Остальные запросы выполняются в общем потоке
+    синхронного кода, как это делает Django для синхронных представлений.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in READ_METHODS:
+            return await sync_to_async(
+                render_response, thread_sensitive=False,
+                executor=get_executor()
+            )(view, request, *args, **kwargs)
+        return await sync_to_async(view)(request, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,85 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+
+def get_version_key(namespace):
+    return f'api:{namespace}:version'
+
+
+def get_cache_version(namespace):
+    """Версия данных пространства имен: время последнего изменения."""
+    key = get_version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        version = int(time.time())
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_cache_version(namespace):
+    """Делает устаревшими все закешированные ответы пространства имен."""
+    key = get_version_key(namespace)
+    version = max(int(time.time()), cache.get(key, 0) + 1)
+    cache.set(key, version, timeout=None)
+
+
+class CachedResponseMixin:
+    """Кеширование ответов list и retrieve по версии данных.
+
+    Версия хранится в кеше и увеличивается сигналами моделей, поэтому
+    старые ответы перестают использоваться без явного удаления. Ответ
+    содержит заголовки ETag, Last-Modified и Cache-Control, а запрос с
+    совпадающим If-None-Match получает 304 без обращения к БД. При
+    store=False данные не кешируются, остаются только заголовки и 304.
+    """
+    cache_namespace = None
+
+    def get_cached_response(self, request, get_response, store=True):
+        version = get_cache_version(self.cache_namespace)
+        etag = f'"{self.cache_namespace}-{version}"'
+        not_modified = get_conditional_response(
+            request, etag=etag, last_modified=version
+        )
+        if not_modified is not None:
+            response = Response(status=not_modified.status_code)
+        elif not store:
+            response = get_response()
+            if response.status_code != 200:
+                return response
+        else:
+            key = (f'api:{self.cache_namespace}:{version}:'
+                   f'{request.get_full_path()}')
+            data = cache.get(key)
+            if data is None:
+                response = get_response()
+                if response.status_code != 200:
+                    return response
+                cache.set(key, response.data, settings.API_CACHE_TIMEOUT)
+            else:
+                response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(version)
+        patch_cache_control(
+            response, public=True, max_age=settings.API_CACHE_MAX_AGE
+        )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, lambda: super(CachedResponseMixin, self).list(
+                request, *args, **kwargs
+            )
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_cached_response(
+            request, lambda: super(CachedResponseMixin, self).retrieve(
+                request, *args, **kwargs
+            )
+        )
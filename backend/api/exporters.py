@@ -0,0 +1,137 @@
+import csv
+import io
+import json
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+SHOPPING_LIST_TITLE = 'Список покупок:'
+
+
+class Echo:
+    """Псевдо-файл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListExporter:
+    """Базовый класс выгрузки списка покупок.
+
+    Принимает итератор строк вида {'name', 'measurement_unit', 'amount'}
+    и отдает содержимое файла по частям, не собирая его в памяти целиком.
+    """
+    content_type = 'text/plain'
+    extension = 'txt'
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def get_filename(self):
+        return f'shopping_cart.{self.extension}'
+
+    def __iter__(self):
+        raise NotImplementedError
+
+
+class TextExporter(ShoppingListExporter):
+    """Выгрузка списка покупок в текстовом формате."""
+    content_type = 'text/plain; charset=utf-8'
+    extension = 'txt'
+
+    def __iter__(self):
+        yield f'{SHOPPING_LIST_TITLE}\n'
+        for row in self.rows:
+            yield (f'{row["name"]} ({row["measurement_unit"]}) - '
+                   f'{row["amount"]} \n')
+
+
+class CSVExporter(ShoppingListExporter):
+    """Выгрузка списка покупок в формате CSV."""
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    def __iter__(self):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for row in self.rows:
+            yield writer.writerow(
+                (row['name'], row['measurement_unit'], row['amount'])
+            )
+
+
+class JSONLinesExporter(ShoppingListExporter):
+    """Выгрузка списка покупок в формате JSON Lines."""
+    content_type = 'application/x-ndjson; charset=utf-8'
+    extension = 'jsonl'
+
+    def __iter__(self):
+        for row in self.rows:
+            yield json.dumps(
+                {'name': row['name'],
+                 'measurement_unit': row['measurement_unit'],
+                 'amount': row['amount']},
+                ensure_ascii=False,
+            ) + '\n'
+
+
+class PDFExporter(ShoppingListExporter):
+    """Выгрузка списка покупок в формате PDF с разбиением на страницы.
+
+    Строки выводятся постранично по мере чтения из курсора. Сам документ
+    отдается после закрытия, так как таблица ссылок PDF пишется в конце
+    файла.
+    """
+    content_type = 'application/pdf'
+    extension = 'pdf'
+    font_name = 'ShoppingListFont'
+    font_size = 12
+    title_font_size = 16
+    margin = 50
+    line_height = 18
+    chunk_size = 64 * 1024
+
+    def register_font(self):
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(
+                TTFont(self.font_name, settings.PDF_FONT_PATH)
+            )
+
+    def __iter__(self):
+        self.register_font()
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        height = A4[1]
+        pdf.setFont(self.font_name, self.title_font_size)
+        pdf.drawString(self.margin, height - self.margin, SHOPPING_LIST_TITLE)
+        y = height - self.margin - self.line_height * 2
+        pdf.setFont(self.font_name, self.font_size)
+        for row in self.rows:
+            if y < self.margin:
+                pdf.showPage()
+                pdf.setFont(self.font_name, self.font_size)
+                y = height - self.margin
+            pdf.drawString(
+                self.margin, y,
+                f'{row["name"]} ({row["measurement_unit"]}) - '
+                f'{row["amount"]}'
+            )
+            y -= self.line_height
+        pdf.save()
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+EXPORTERS = {
+    'txt': TextExporter,
+    'csv': CSVExporter,
+    'json': JSONLinesExporter,
+    'pdf': PDFExporter,
+}
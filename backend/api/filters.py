@@ -1,43 +1,61 @@
+from api.services import get_tag_ids
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, NumberFilter, filters
-from recipes.models import Ingredient, Recipe, Tag
-
-
-class IngredientSearchFilterSet(FilterSet):
-    """Поиск по названию ингредиента."""
-    name = filters.CharFilter(lookup_expr='istartswith')
-
-    class Meta:
-        model = Ingredient
-        fields = ('name', )
+from recipes.models import Recipe
+from recipes.search import WORD, search_recipes
 
 
 class RecipeFilterSet(FilterSet):
     """Класс фильтрации рецептов."""
     author = NumberFilter(field_name='author__id')
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tag.objects.all()
-    )
+    tags = filters.CharFilter(method='filter_tags')
     is_favorited = NumberFilter(method='filter_is_favorited')
     is_in_shopping_cart = NumberFilter(method='filter_shopping_cart')
+    search = filters.CharFilter(method='filter_search')
+
+    def filter_tags(self, queryset, name, value):
+        """Рецепты хотя бы с одним из тэгов, переданных через ?tags=.
+
+        Фильтр через EXISTS не размножает строки рецептов, поэтому
+        DISTINCT не нужен.
+        """
+        tag_ids = get_tag_ids(self.request.query_params.getlist(name))
+        if not tag_ids:
+            return queryset.none()
+        return queryset.filter(Exists(
+            Recipe.tags.through.objects.filter(
+                recipe_id=OuterRef('pk'), tag_id__in=tag_ids
+            )
+        ))
 
     def filter_is_favorited(self, queryset, name, value):
-        user = self.request.user
         if value == 1:
-            return queryset.filter(favorite_recipe__user=user)
+            return queryset.filter(is_favorited=True)
         if value == 0:
-            return queryset.exclude(favorite_recipe__user=user)
+            return queryset.filter(is_favorited=False)
         return queryset
 
     def filter_shopping_cart(self, queryset, name, value):
-        user = self.request.user
         if value == 1:
-            return queryset.filter(recipe_in_shopping_cart__user=user)
+            return queryset.filter(is_in_shopping_cart=True)
         if value == 0:
-            return queryset.exclude(recipe_in_shopping_cart__user=user)
+            return queryset.filter(is_in_shopping_cart=False)
         return queryset
 
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию и описанию рецепта.
+
+        Без явного ?ordering= рецепты упорядочены по релевантности. Запрос
+        без слов, например из одних знаков препинания, не фильтрует рецепты.
+        """
+        if not WORD.search(value):
+            return queryset
+        queryset = search_recipes(queryset, value)
+        if 'ordering' in self.request.query_params:
+            return queryset
+        return queryset.order_by('-rank', '-created', '-id')
+
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart',
+                  'search')
@@ -0,0 +1,76 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from recipes.models import Ingredient
+
+
+class IngredientIndex:
+    """Индекс ингредиентов в памяти процесса для автодополнения.
+
+    Справочник ингредиентов небольшой и меняется редко, поэтому он целиком
+    хранится отсортированным по названию в нижнем регистре. Поиск по
+    префиксу выполняется бинарным поиском, совпадения по подстроке
+    выводятся после совпадений по префиксу. Индекс сбрасывается сигналами
+    модели Ingredient и перечитывается не реже, чем раз в
+    INGREDIENT_INDEX_TTL секунд, чтобы другие процессы не отставали.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data = None
+        self._loaded_at = 0
+
+    def invalidate(self):
+        self._data = None
+
+    def _load(self):
+        items = [
+            {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        ]
+        items.sort(key=lambda item: (item['name'].casefold(), item['id']))
+        keys = [item['name'].casefold() for item in items]
+        return keys, items
+
+    def _get_data(self):
+        data = self._data
+        expired = (
+            time.monotonic() - self._loaded_at > settings.INGREDIENT_INDEX_TTL
+        )
+        if data is not None and not expired:
+            return data
+        with self._lock:
+            if self._data is None or expired:
+                self._data = self._load()
+                self._loaded_at = time.monotonic()
+            return self._data
+
+    def search(self, query='', limit=None):
+        """Ингредиенты, название которых начинается с query или содержит его.
+
+        Сначала идут совпадения по префиксу в алфавитном порядке, затем
+        совпадения по подстроке. limit ограничивает число результатов.
+        """
+        keys, items = self._get_data()
+        query = query.casefold()
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        results = items[start:end]
+        if limit is not None and len(results) >= limit:
+            return results[:limit]
+        if query:
+            for index, key in enumerate(keys):
+                if query in key and not start <= index < end:
+                    results.append(items[index])
+                    if limit is not None and len(results) >= limit:
+                        break
+        return results
+
+
+ingredient_index = IngredientIndex()
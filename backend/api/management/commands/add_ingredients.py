@@ -1,15 +1,119 @@
 import csv
+import json
+import os
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from api.caching import bump_cache_version
+from api.ingredient_index import ingredient_index
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import Ingredient
 
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, 'static/data/ingredients.csv')
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Читает JSON-массив объектов по одному, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = file.read(READ_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив ингредиентов')
+    buffer = buffer[1:]
+    eof = False
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise CommandError('Некорректный JSON-файл')
+            chunk = file.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
+
 
 class Command(BaseCommand):
     """Импорт ингредиентов в БД"""
-    help = 'Импорт ингредиентов в БД из .csv файла'
+    help = 'Импорт ингредиентов в БД из .csv или .json файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=DEFAULT_PATH,
+            help='Путь к файлу с ингредиентами'
+        )
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Выполнить импорт и откатить транзакцию'
+        )
 
     def handle(self, *args, **options):
-        with open('static/data/ingredients.csv', encoding='utf-8') as csvfile:
-            reader = csv.reader(csvfile)
-            for row in reader:
-                Ingredient.objects.create(name=row[0], measurement_unit=row[1])
+        path = options['path']
+        file_format = (
+            options['format'] or os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if file_format not in READERS:
+            raise CommandError(
+                f'Неизвестный формат файла: {file_format}. '
+                f'Укажите --format {"/".join(READERS)}'
+            )
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        started = time.monotonic()
+        total = 0
+        with open(path, encoding='utf-8') as file, transaction.atomic():
+            count_before = Ingredient.objects.count()
+            rows = READERS[file_format](file)
+            while True:
+                batch = [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in islice(
+                        rows, options['batch_size']
+                    )
+                ]
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Обработано строк: {total}')
+            created = Ingredient.objects.count() - count_before
+            if options['dry_run']:
+                transaction.set_rollback(True)
+        ingredient_index.invalidate()
+        bump_cache_version('ingredients')
+        elapsed = time.monotonic() - started
+        rate = total / elapsed if elapsed else total
+        prefix = 'Пробный запуск: ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix}обработано {total} строк, добавлено {created}, '
+            f'пропущено {total - created} за {elapsed:.2f} с '
+            f'({rate:.0f} строк/с)'
+        ))
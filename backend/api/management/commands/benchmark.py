@@ -0,0 +1,270 @@
+import json
+import math
+import re
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from api.pagination import RecipeCursorPagination
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+from rest_framework.authtoken.models import Token
+from rest_framework.pagination import Cursor
+from users.models import User
+
+SERVER_TIMING_QUERIES = re.compile(r'db;desc="(\d+) queries"')
+
+PAGE_SIZE = RecipeCursorPagination.page_size
+
+
+def get_deep_pages(page_size=PAGE_SIZE, count=5):
+    """Последние страницы списка рецептов: номер и адрес с курсором.
+
+    Курсор указывает на последний рецепт предыдущей страницы, поэтому
+    обе пагинации читают одни и те же рецепты и сравнимы между собой.
+    """
+    recipes = Recipe.objects.order_by(
+        *RecipeCursorPagination.ordering
+    ).values_list('created', flat=True)
+    last_page = max(1, math.ceil(recipes.count() / page_size))
+    paginator = RecipeCursorPagination()
+    paginator.base_url = '/api/recipes/'
+    deep_pages = []
+    for page in range(max(1, last_page - count + 1), last_page + 1):
+        if page == 1:
+            url = f'/api/recipes/?pagination=cursor&limit={page_size}'
+        else:
+            position = recipes[(page - 1) * page_size - 1]
+            url = paginator.encode_cursor(Cursor(
+                offset=0, reverse=False, position=str(position)
+            )) + f'&limit={page_size}'
+        deep_pages.append((page, url))
+    return deep_pages
+
+
+def get_endpoints(tag_slugs, prefixes, ingredient_ids, deep_pages):
+    """Адреса горячих маршрутов API; функции получают номер запроса."""
+    return {
+        'recipes_list': lambda number: (
+            f'/api/recipes/?page={number % 5 + 1}&limit={PAGE_SIZE}'
+        ),
+        'recipes_deep_page': lambda number: (
+            f'/api/recipes/?page={deep_pages[number % len(deep_pages)][0]}'
+            f'&limit={PAGE_SIZE}'
+        ),
+        'recipes_cursor': lambda number: (
+            deep_pages[number % len(deep_pages)][1]
+        ),
+        'recipes_filtered': lambda number: (
+            f'/api/recipes/?tags={tag_slugs[number % len(tag_slugs)]}'
+            f'&is_favorited=1&limit=6'
+        ),
+        'subscriptions': lambda number: (
+            f'/api/users/subscriptions/?recipes_limit={number % 3 + 1}'
+        ),
+        'download_shopping_cart': lambda number: (
+            '/api/recipes/download_shopping_cart/'
+        ),
+        'ingredient_search': lambda number: (
+            f'/api/ingredients/?name={prefixes[number % len(prefixes)]}'
+        ),
+        'from_ingredients': lambda number: (
+            '/api/recipes/from_ingredients/?' + '&'.join(
+                f'ingredients={ingredient_id}'
+                for ingredient_id in ingredient_ids[number % 5::5]
+            )
+        ),
+    }
+
+
+def percentile(values, percent):
+    """Значение перцентиля по методу ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(1, round(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class ClientRunner:
+    """Запросы через тестовый клиент Django в текущем процессе.
+
+    Время до первого байта - время до первой части потокового ответа,
+    у обычного ответа оно совпадает с временем всего запроса.
+    """
+
+    def __init__(self, token):
+        self.client = Client(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def request(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = self.client.get(path)
+            if response.streaming:
+                content = iter(response.streaming_content)
+                next(content, b'')
+                first_byte = time.perf_counter() - started
+                b''.join(content)
+                duration = time.perf_counter() - started
+            else:
+                duration = first_byte = time.perf_counter() - started
+        return response.status_code, duration, first_byte, len(queries)
+
+
+class HTTPRunner:
+    """Запросы к запущенному серверу, например gunicorn.
+
+    Число SQL-запросов берется из заголовка Server-Timing, поэтому сервер
+    должен работать с METRICS_ENABLED=True и METRICS_SAMPLE_RATE=1.
+    Время до первого байта - время до получения первого байта тела ответа.
+    """
+
+    def __init__(self, token, url):
+        self.token = token
+        self.url = url.rstrip('/')
+
+    def request(self, path):
+        request = urllib.request.Request(
+            self.url + path, headers={'Authorization': f'Token {self.token}'}
+        )
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request) as response:
+                response.read(1)
+                first_byte = time.perf_counter() - started
+                response.read()
+                status_code = response.status
+                server_timing = response.headers.get('Server-Timing', '')
+        except urllib.error.HTTPError as error:
+            status_code, server_timing = error.code, ''
+            first_byte = time.perf_counter() - started
+        duration = time.perf_counter() - started
+        match = SERVER_TIMING_QUERIES.search(server_timing)
+        return (status_code, duration, first_byte,
+                int(match[1]) if match else None)
+
+
+class Command(BaseCommand):
+    """Замер задержек горячих маршрутов API"""
+    help = ('Выполняет запросы к основным маршрутам API и выводит '
+            'p50/p95, число SQL-запросов и пропускную способность в JSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Количество запросов к каждому маршруту'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Количество запросов для прогрева, не входящих в замер'
+        )
+        parser.add_argument(
+            '--endpoint', action='append',
+            help='Замерять только указанные маршруты'
+        )
+        parser.add_argument(
+            '--user',
+            help='Имя пользователя, по умолчанию владелец самой большой '
+                 'корзины'
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера вместо тестового клиента'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Число параллельных запросов, только вместе с --url'
+        )
+        parser.add_argument('--output', help='Файл для отчета в JSON')
+
+    def get_user(self, username):
+        if username:
+            user = User.objects.filter(username=username).first()
+            if user is None:
+                raise CommandError(f'Пользователь {username} не найден')
+            return user
+        user_id = ShoppingCart.objects.values('user_id').order_by().annotate(
+            count=Count('id')
+        ).order_by('-count').values_list('user_id', flat=True).first()
+        user = User.objects.filter(pk=user_id).first() or User.objects.first()
+        if user is None:
+            raise CommandError('В БД нет пользователей, выполните seed_data')
+        return user
+
+    def run_endpoint(self, runner, get_path, options):
+        for number in range(options['warmup']):
+            runner.request(get_path(number))
+        paths = [get_path(number) for number in range(options['requests'])]
+        started = time.perf_counter()
+        if options['concurrency'] > 1:
+            with ThreadPoolExecutor(options['concurrency']) as pool:
+                results = list(pool.map(runner.request, paths))
+        else:
+            results = [runner.request(path) for path in paths]
+        elapsed = time.perf_counter() - started
+        durations = [result[1] * 1000 for result in results]
+        first_bytes = [result[2] * 1000 for result in results]
+        queries = [result[3] for result in results if result[3] is not None]
+        return {
+            'requests': len(results),
+            'errors': sum(result[0] >= 400 for result in results),
+            'p50_ms': round(percentile(durations, 50), 3),
+            'p95_ms': round(percentile(durations, 95), 3),
+            'mean_ms': round(sum(durations) / len(durations), 3),
+            'ttfb_p50_ms': round(percentile(first_bytes, 50), 3),
+            'ttfb_p95_ms': round(percentile(first_bytes, 95), 3),
+            'queries_per_request': (
+                round(sum(queries) / len(queries), 2) if queries else None
+            ),
+            'throughput_rps': round(len(results) / elapsed, 2),
+        }
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests должен быть больше 0')
+        if options['concurrency'] > 1 and not options['url']:
+            raise CommandError('--concurrency работает только с --url')
+        user = self.get_user(options['user'])
+        token, _ = Token.objects.get_or_create(user=user)
+        tag_slugs = list(Tag.objects.values_list('slug', flat=True)) or ['']
+        prefixes = sorted({
+            name[:2] for name in Ingredient.objects.values_list(
+                'name', flat=True
+            )[:200]
+        }) or ['']
+        ingredient_ids = list(Ingredient.objects.order_by(
+            '?'
+        ).values_list('id', flat=True)[:25]) or [0]
+        endpoints = get_endpoints(
+            tag_slugs, prefixes, ingredient_ids, get_deep_pages()
+        )
+        selected = options['endpoint'] or list(endpoints)
+        unknown = set(selected) - endpoints.keys()
+        if unknown:
+            raise CommandError(
+                f'Неизвестные маршруты: {", ".join(sorted(unknown))}. '
+                f'Доступны: {", ".join(endpoints)}'
+            )
+        if options['url']:
+            runner = HTTPRunner(token.key, options['url'])
+        else:
+            runner = ClientRunner(token.key)
+        report = {
+            'mode': 'http' if options['url'] else 'client',
+            'url': options['url'],
+            'user': user.username,
+            'concurrency': options['concurrency'],
+            'endpoints': {
+                name: self.run_endpoint(runner, endpoints[name], options)
+                for name in selected
+            },
+        }
+        output = json.dumps(report, ensure_ascii=False, indent=2,
+                            sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output + '\n')
+        self.stdout.write(output)
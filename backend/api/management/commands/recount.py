@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.signals import count_subquery
+from users.models import Subscription, User
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+)
+
+
+class Command(BaseCommand):
+    """Пересчет счетчиков избранного, корзины, рецептов и подписчиков"""
+    help = 'Исправляет расхождения денормализованных счетчиков с данными'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model, counter, related_model, field in COUNTERS:
+                drifted = model.objects.annotate(
+                    actual=count_subquery(related_model, field)
+                ).filter(~Q(**{counter: F('actual')}))
+                fixed = model.objects.filter(
+                    pk__in=drifted.values('pk')
+                ).update(**{counter: count_subquery(related_model, field)})
+                self.stdout.write(
+                    f'{model._meta.model_name}.{counter}: исправлено {fixed}'
+                )
+        self.stdout.write(self.style.SUCCESS('Счетчики пересчитаны'))
@@ -0,0 +1,46 @@
+from itertools import groupby
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import IngredientsAmount, Recipe
+from recipes.units import build_ingredient_vector
+
+
+class Command(BaseCommand):
+    """Пересчет векторов ингредиентов рецептов"""
+    help = ('Перестраивает векторы ингредиентов, по которым собирается '
+            'список покупок')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество рецептов в одном UPDATE'
+        )
+
+    def handle(self, *args, **options):
+        amounts = IngredientsAmount.objects.order_by('recipe_id').values_list(
+            'recipe_id', 'ingredient_id', 'amount',
+            'ingredient__measurement_unit'
+        )
+        total = 0
+        with transaction.atomic():
+            Recipe.objects.update(ingredient_vector=[])
+            batch = []
+            for recipe_id, rows in groupby(
+                amounts.iterator(), key=lambda row: row[0]
+            ):
+                batch.append(Recipe(
+                    pk=recipe_id,
+                    ingredient_vector=build_ingredient_vector(
+                        row[1:] for row in rows
+                    )
+                ))
+                if len(batch) >= options['batch_size']:
+                    Recipe.objects.bulk_update(batch, ('ingredient_vector',))
+                    total += len(batch)
+                    batch = []
+            Recipe.objects.bulk_update(batch, ('ingredient_vector',))
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Векторы ингредиентов пересчитаны для {total} рецептов'
+        ))
@@ -0,0 +1,51 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from recipes.images import (process_recipe_image,
+                            process_recipe_image_in_worker)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """Построение недостающих вариантов изображений рецептов"""
+    help = ('Строит уменьшенные копии изображений рецептов, у которых их '
+            'нет или они построены для прежней картинки: рецептов, созданных '
+            'до появления копий, и рецептов, чья обработка была потеряна '
+            'при перезапуске')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Количество потоков обработки изображений'
+        )
+
+    def get_stale_recipe_ids(self):
+        recipes = Recipe.objects.exclude(image='').order_by('id').values_list(
+            'id', 'image', 'image_renditions'
+        )
+        return [
+            recipe_id for recipe_id, image, renditions in recipes.iterator()
+            if renditions.get('source') != image
+        ]
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('--workers должно быть больше 0')
+        started = time.monotonic()
+        recipe_ids = self.get_stale_recipe_ids()
+        if options['workers'] == 1:
+            for recipe_id in recipe_ids:
+                process_recipe_image(recipe_id)
+        else:
+            with ThreadPoolExecutor(
+                max_workers=options['workers'],
+                thread_name_prefix='recipe-images'
+            ) as executor:
+                list(executor.map(process_recipe_image_in_worker, recipe_ids))
+        failed = len(self.get_stale_recipe_ids())
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработаны изображения {len(recipe_ids)} рецептов, '
+            f'не удалось обработать {failed}, за '
+            f'{time.monotonic() - started:.2f} с'
+        ))
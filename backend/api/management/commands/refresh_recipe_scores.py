@@ -0,0 +1,69 @@
+import math
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from recipes.models import Favorite, Recipe, RecipeScore, ShoppingCart
+
+
+class Command(BaseCommand):
+    """Пересчет оценок популярности рецептов"""
+    help = ('Перестраивает таблицу оценок для сортировки рецептов '
+            'по ?ordering=popular и ?ordering=trending')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество строк в одном INSERT'
+        )
+
+    def get_trending(self, now):
+        """Сумма добавлений в избранное и корзину с затуханием по времени.
+
+        Вес добавления уменьшается вдвое каждые TRENDING_HALF_LIFE_HOURS,
+        добавления старше TRENDING_WINDOW_DAYS не учитываются.
+        """
+        since = now - timedelta(days=settings.TRENDING_WINDOW_DAYS)
+        half_life = settings.TRENDING_HALF_LIFE_HOURS * 3600
+        trending = defaultdict(float)
+        for model in (Favorite, ShoppingCart):
+            events = model.objects.filter(created__gte=since).values_list(
+                'recipe_id', 'created'
+            )
+            for recipe_id, created in events.iterator():
+                age = (now - created).total_seconds()
+                trending[recipe_id] += math.pow(0.5, age / half_life)
+        return trending
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        now = timezone.now()
+        trending = self.get_trending(now)
+        recipes = Recipe.objects.order_by().values_list(
+            'id', 'favorites_count', 'shopping_cart_count'
+        )
+        total = 0
+        with transaction.atomic():
+            RecipeScore.objects.all().delete()
+            batch = []
+            for recipe_id, favorites, carts in recipes.iterator():
+                batch.append(RecipeScore(
+                    recipe_id=recipe_id,
+                    popular=favorites + carts,
+                    trending=trending.get(recipe_id, 0),
+                    updated=now,
+                ))
+                if len(batch) >= options['batch_size']:
+                    RecipeScore.objects.bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            RecipeScore.objects.bulk_create(batch)
+            total += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Оценки пересчитаны для {total} рецептов за '
+            f'{time.monotonic() - started:.2f} с'
+        ))
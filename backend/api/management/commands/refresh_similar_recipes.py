@@ -0,0 +1,286 @@
+import heapq
+import math
+import time
+from array import array
+from collections import Counter, defaultdict
+from itertools import islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from recipes.models import IngredientsAmount, Recipe, RecipeSimilarity
+
+
+class Command(BaseCommand):
+    """Расчет похожих рецептов"""
+    help = ('Находит для каждого рецепта ближайшие по ингредиентам и тэгам '
+            'рецепты и сохраняет их в таблицу похожих рецептов')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать все рецепты, а не только измененные'
+        )
+        parser.add_argument(
+            '--top', type=int, default=settings.SIMILAR_RECIPES_COUNT,
+            help='Количество похожих рецептов для каждого рецепта'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Количество рецептов, обрабатываемых за один проход'
+        )
+        parser.add_argument(
+            '--max-df', type=float, default=0.2,
+            help='Не учитывать ингредиенты, которые есть у большей доли '
+                 'рецептов, например соль'
+        )
+        parser.add_argument(
+            '--tag-max-df', type=float, default=1.0,
+            help='То же для тэгов. Тэги только меняют оценку рецептов, '
+                 'найденных по ингредиентам, поэтому по умолчанию '
+                 'учитываются все'
+        )
+        parser.add_argument(
+            '--max-postings', type=int, default=500,
+            help='Ингредиенты, которые есть у большего числа рецептов, не '
+                 'используются для поиска кандидатов, а только учитываются '
+                 'в их оценке'
+        )
+        parser.add_argument(
+            '--tag-weight', type=float, default=0.5,
+            help='Вес тэга относительно ингредиента'
+        )
+
+    def load_features(self, options):
+        """Признаки рецептов: ингредиенты - четные, тэги - нечетные числа.
+
+        Кандидаты ищутся только по спискам рецептов редких ингредиентов,
+        не длиннее --max-postings, поэтому их число на рецепт ограничено и
+        расчет не становится квадратичным. Частые ингредиенты и тэги
+        хранятся у рецепта множеством и добавляются к оценке уже
+        найденных кандидатов.
+        """
+        features = defaultdict(lambda: array('q'))
+        amounts = IngredientsAmount.objects.order_by().values_list(
+            'recipe_id', 'ingredient_id'
+        )
+        for recipe_id, ingredient_id in amounts.iterator():
+            features[recipe_id].append(ingredient_id * 2)
+        tags = Recipe.tags.through.objects.order_by().values_list(
+            'recipe_id', 'tag_id'
+        )
+        for recipe_id, tag_id in tags.iterator():
+            features[recipe_id].append(tag_id * 2 + 1)
+        document_frequency = Counter()
+        for recipe_features in features.values():
+            document_frequency.update(recipe_features)
+        total = len(features)
+        max_df = (
+            max(1, options['max_df'] * total),
+            max(1, options['tag_max_df'] * total),
+        )
+        # Признаки бинарные, поэтому в скалярное произведение и норму
+        # входят квадраты весов idf, их и храним
+        self.weights = {
+            feature: (
+                math.log(1 + total / frequency)
+                * (options['tag_weight'] if feature % 2 else 1)
+            ) ** 2
+            for feature, frequency in document_frequency.items()
+            if frequency <= max_df[feature % 2]
+        }
+        self.frequency = document_frequency
+        self.postings = defaultdict(lambda: array('q'))
+        self.norms = {}
+        self.features = {}
+        self.dense = {}
+        for recipe_id, recipe_features in features.items():
+            kept = [f for f in recipe_features if f in self.weights]
+            ingredients = [f for f in kept if not f % 2]
+            if not ingredients:
+                continue
+            self.features[recipe_id] = [
+                f for f in ingredients
+                if document_frequency[f] <= options['max_postings']
+            ]
+            self.dense[recipe_id] = frozenset(
+                f for f in kept
+                if f % 2 or document_frequency[f] > options['max_postings']
+            )
+            self.norms[recipe_id] = math.sqrt(
+                sum(self.weights[f] for f in kept)
+            )
+            for feature in ingredients:
+                self.postings[feature].append(recipe_id)
+
+    def get_candidates(self, recipe_id, options):
+        """Скалярные произведения по редким ингредиентам.
+
+        Если редких ингредиентов у рецепта нет, кандидатами становятся
+        последние --max-postings рецептов с его самым редким ингредиентом.
+        """
+        dot = defaultdict(float)
+        for feature in self.features[recipe_id]:
+            weight = self.weights[feature]
+            for other_id in self.postings[feature]:
+                dot[other_id] += weight
+        if not dot:
+            rarest = min(
+                (f for f in self.dense[recipe_id] if not f % 2),
+                key=self.frequency.__getitem__
+            )
+            for other_id in self.postings[rarest][-options['max_postings']:]:
+                dot[other_id] = 0.0
+        dot.pop(recipe_id, None)
+        return dot
+
+    def get_scores(self, recipe_id, options):
+        """Косинусное сходство рецепта с найденными кандидатами.
+
+        Общие частые ингредиенты и тэги добавляются к скалярному
+        произведению каждого кандидата пересечением множеств.
+        """
+        dense = self.dense[recipe_id]
+        norm = self.norms[recipe_id]
+        scores = {}
+        for other_id, value in self.get_candidates(
+            recipe_id, options
+        ).items():
+            if dense:
+                value += sum(
+                    self.weights[f] for f in dense & self.dense[other_id]
+                )
+            scores[other_id] = value / (norm * self.norms[other_id])
+        return scores
+
+    def save(self, top, computed):
+        """Заменяет похожие рецепты для рецептов из top."""
+        with transaction.atomic():
+            RecipeSimilarity.objects.filter(recipe_id__in=top).delete()
+            RecipeSimilarity.objects.bulk_create(
+                RecipeSimilarity(
+                    recipe_id=recipe_id, similar_id=similar_id,
+                    score=score, computed=computed
+                )
+                for recipe_id, neighbours in top.items()
+                for similar_id, score in neighbours
+            )
+
+    def recompute(self, recipe_ids, options, computed, incoming=None):
+        """Считает похожие рецепты для recipe_ids по частям.
+
+        Если передан incoming, в него складываются оценки в обратную
+        сторону: сходство симметрично, поэтому рецепт other_id получает
+        кандидата recipe_id без отдельного расчета. Для каждого рецепта
+        хранится только куча из top лучших кандидатов.
+        """
+        recipe_ids = iter(recipe_ids)
+        total = 0
+        while True:
+            chunk = list(islice(recipe_ids, options['chunk_size']))
+            if not chunk:
+                return total
+            top = {}
+            for recipe_id in chunk:
+                if recipe_id not in self.features:
+                    top[recipe_id] = []
+                    continue
+                scores = self.get_scores(recipe_id, options)
+                top[recipe_id] = heapq.nlargest(
+                    options['top'], scores.items(), key=lambda item: item[1]
+                )
+                if incoming is not None:
+                    for other_id, score in scores.items():
+                        candidates = incoming[other_id]
+                        if len(candidates) < options['top']:
+                            heapq.heappush(candidates, (score, recipe_id))
+                        elif score > candidates[0][0]:
+                            heapq.heapreplace(candidates, (score, recipe_id))
+            self.save(top, computed)
+            total += len(chunk)
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Обработано рецептов: {total}')
+
+    def merge_incoming(self, incoming, changed, options, computed):
+        """Добавляет измененные рецепты в списки остальных рецептов.
+
+        Измененные рецепты убираются из прежних списков и попадают в них
+        снова, только если по-прежнему имеют общие признаки. Сохраняются
+        только списки, которые от этого изменились.
+        """
+        recipe_ids = iter(sorted(incoming.keys() - changed))
+        total = 0
+        while True:
+            chunk = list(islice(recipe_ids, options['chunk_size']))
+            if not chunk:
+                return total
+            previous = defaultdict(set)
+            current = defaultdict(list)
+            for recipe_id, similar_id, score in (
+                RecipeSimilarity.objects.filter(recipe_id__in=chunk)
+                .values_list('recipe_id', 'similar_id', 'score')
+            ):
+                previous[recipe_id].add((similar_id, score))
+                if similar_id not in changed:
+                    current[recipe_id].append((similar_id, score))
+            top = {}
+            for recipe_id in chunk:
+                neighbours = heapq.nlargest(
+                    options['top'],
+                    current[recipe_id] + [
+                        (similar_id, score)
+                        for score, similar_id in incoming[recipe_id]
+                    ],
+                    key=lambda item: item[1]
+                )
+                if set(neighbours) != previous[recipe_id]:
+                    top[recipe_id] = neighbours
+            self.save(top, computed)
+            total += len(top)
+
+    def handle(self, *args, **options):
+        if min(options['top'], options['chunk_size'],
+               options['max_postings']) < 1:
+            raise CommandError(
+                '--top, --chunk-size и --max-postings должны быть больше 0'
+            )
+        started = time.monotonic()
+        computed = timezone.now()
+        since = None
+        if not options['full']:
+            since = RecipeSimilarity.objects.aggregate(
+                since=Max('computed')
+            )['since']
+        self.load_features(options)
+        if since is None:
+            recipe_ids = Recipe.objects.order_by('id').values_list(
+                'id', flat=True
+            )
+            total = self.recompute(recipe_ids.iterator(), options, computed)
+            merged = 0
+        else:
+            changed = set(Recipe.objects.filter(
+                updated__gte=since
+            ).values_list('id', flat=True))
+            # Рецепты, в списках которых есть измененный рецепт: если
+            # общих признаков с ним не осталось, список считается заново
+            listed = set(RecipeSimilarity.objects.filter(
+                similar__updated__gte=since
+            ).values_list('recipe_id', flat=True).distinct())
+            incoming = defaultdict(list)
+            total = self.recompute(
+                sorted(changed), options, computed, incoming
+            )
+            merged = self.merge_incoming(
+                incoming, changed, options, computed
+            )
+            merged += self.recompute(
+                sorted(listed - changed - incoming.keys()), options, computed
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты пересчитаны для {total} рецептов, '
+            f'обновлены списки {merged} рецептов за '
+            f'{time.monotonic() - started:.2f} с'
+        ))
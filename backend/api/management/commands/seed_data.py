@@ -0,0 +1,226 @@
+import io
+import random
+import time
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+from recipes.models import (Favorite, Ingredient, IngredientsAmount, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Subscription, User
+
+SEED_IMAGE = 'recipes/images/seed.png'
+SEED_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+class ZipfSampler:
+    """Выбор элементов с вероятностью, обратной степени s их ранга.
+
+    Порядок population задает популярность: первый элемент выбирается
+    чаще всего, хвост - редко, как у реальных избранного и подписок.
+    """
+
+    def __init__(self, population, s, rng):
+        self.population = population
+        self.cum_weights = list(accumulate(
+            1 / rank ** s for rank in range(1, len(population) + 1)
+        ))
+        self.rng = rng
+
+    def sample(self, k):
+        return self.rng.choices(
+            self.population, cum_weights=self.cum_weights, k=k
+        )
+
+    def sample_unique(self, k, exclude=None):
+        return set(self.sample(k)) - {exclude}
+
+
+class Command(BaseCommand):
+    """Генерация синтетических данных для нагрузочного тестирования"""
+    help = ('Создает пользователей, рецепты, избранное, списки покупок '
+            'и подписки с распределением Ципфа')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее число рецептов в избранном пользователя'
+        )
+        parser.add_argument(
+            '--cart', type=int, default=3,
+            help='Среднее число рецептов в списке покупок пользователя'
+        )
+        parser.add_argument(
+            '--subscriptions', type=int, default=5,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=8,
+            help='Среднее число ингредиентов в рецепте'
+        )
+        parser.add_argument(
+            '--zipf', type=float, default=1.1,
+            help='Показатель распределения Ципфа'
+        )
+        parser.add_argument(
+            '--password', default='seed-password',
+            help='Пароль всех созданных пользователей'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help='Количество строк в одном INSERT'
+        )
+
+    def bulk_insert(self, model, objects):
+        total = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch)
+            total += len(batch)
+            if self.verbosity > 1:
+                self.stdout.write(f'{model._meta.model_name}: {total}')
+        self.stdout.write(f'{model._meta.model_name}: создано {total}')
+
+    def random_count(self, average):
+        return self.rng.randint(0, 2 * average)
+
+    def get_tags(self):
+        tag_ids = list(Tag.objects.values_list('id', flat=True))
+        if not tag_ids:
+            Tag.objects.bulk_create(
+                Tag(name=name, color=color, slug=slug)
+                for name, color, slug in SEED_TAGS
+            )
+            tag_ids = list(Tag.objects.values_list('id', flat=True))
+        return tag_ids
+
+    def save_image(self):
+        if default_storage.exists(SEED_IMAGE):
+            return
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), '#CCCCCC').save(buffer, 'PNG')
+        default_storage.save(SEED_IMAGE, ContentFile(buffer.getvalue()))
+
+    def create_users(self, options):
+        password = make_password(options['password'])
+        self.bulk_insert(User, (
+            User(
+                username=f'{self.prefix}{number}',
+                email=f'{self.prefix}{number}@example.com',
+                first_name='Пользователь',
+                last_name=str(number),
+                password=password,
+            )
+            for number in range(options['users'])
+        ))
+        return list(User.objects.filter(
+            username__startswith=self.prefix
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipes(self, options, authors):
+        self.save_image()
+        self.bulk_insert(Recipe, (
+            Recipe(
+                author_id=author_id,
+                name=f'{self.prefix}рецепт {number}',
+                text='Синтетический рецепт для нагрузочного тестирования',
+                image=SEED_IMAGE,
+                cooking_time=self.rng.randint(5, 180),
+            )
+            for number, author_id in enumerate(
+                authors.sample(options['recipes'])
+            )
+        ))
+        return list(Recipe.objects.filter(
+            name__startswith=self.prefix
+        ).order_by('id').values_list('id', flat=True))
+
+    def create_recipe_relations(self, options, recipe_ids):
+        tag_ids = self.get_tags()
+        self.bulk_insert(Recipe.tags.through, (
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, self.rng.randint(1, min(2, len(tag_ids)))
+            )
+        ))
+        ingredients = ZipfSampler(
+            list(Ingredient.objects.values_list('id', flat=True)),
+            options['zipf'], self.rng
+        )
+        self.bulk_insert(IngredientsAmount, (
+            IngredientsAmount(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=self.rng.randint(1, 500),
+            )
+            for recipe_id in recipe_ids
+            for ingredient_id in ingredients.sample_unique(
+                max(1, self.random_count(options['ingredients']))
+            )
+        ))
+
+    def create_user_relations(self, options, user_ids, recipe_ids, authors):
+        recipes = ZipfSampler(
+            self.rng.sample(recipe_ids, len(recipe_ids)),
+            options['zipf'], self.rng
+        )
+        for model, average in ((Favorite, options['favorites']),
+                               (ShoppingCart, options['cart'])):
+            self.bulk_insert(model, (
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in recipes.sample_unique(
+                    self.random_count(average)
+                )
+            ))
+        self.bulk_insert(Subscription, (
+            Subscription(user_id=user_id, author_id=author_id)
+            for user_id in user_ids
+            for author_id in authors.sample_unique(
+                self.random_count(options['subscriptions']), exclude=user_id
+            )
+        ))
+
+    def handle(self, *args, **options):
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно не меньше 2 пользователей и 1 рецепта')
+        if not Ingredient.objects.exists():
+            raise CommandError(
+                'Справочник ингредиентов пуст, выполните add_ingredients'
+            )
+        self.prefix = f'seed{options["seed"]}_'
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Данные с --seed {options["seed"]} уже созданы'
+            )
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.verbosity = options['verbosity']
+        started = time.monotonic()
+        user_ids = self.create_users(options)
+        authors = ZipfSampler(
+            self.rng.sample(user_ids, len(user_ids)), options['zipf'], self.rng
+        )
+        recipe_ids = self.create_recipes(options, authors)
+        self.create_recipe_relations(options, recipe_ids)
+        self.create_user_relations(options, user_ids, recipe_ids, authors)
+        call_command('recount', stdout=self.stdout)
+        call_command('refresh_ingredient_vectors', stdout=self.stdout)
+        call_command('refresh_recipe_scores', stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            f'Данные созданы за {time.monotonic() - started:.2f} с'
+        ))
@@ -0,0 +1,143 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connection, models
+from recipes.models import IngredientsAmount, Recipe
+
+UPGRADED_APPS = ('users', 'recipes')
+
+OLD_INGREDIENTS_TABLE = 'recipes_recipe_ingredients'
+
+BACKFILL_RECIPE = '''
+    UPDATE recipes_ingredientsamount SET recipe_id = (
+        SELECT MIN(m.recipe_id) FROM recipes_recipe_ingredients m
+        WHERE m.ingredientsamount_id = recipes_ingredientsamount.id
+    ) WHERE recipe_id IS NULL
+'''
+
+COPY_SHARED_AMOUNTS = '''
+    INSERT INTO recipes_ingredientsamount (recipe_id, ingredient_id, amount)
+    SELECT m.recipe_id, a.ingredient_id, a.amount
+    FROM recipes_recipe_ingredients m
+    JOIN recipes_ingredientsamount a ON a.id = m.ingredientsamount_id
+    WHERE m.recipe_id <> a.recipe_id
+'''
+
+DELETE_ORPHANS = '''
+    DELETE FROM recipes_ingredientsamount WHERE recipe_id IS NULL
+'''
+
+DELETE_DUPLICATES = '''
+    DELETE FROM recipes_ingredientsamount WHERE id NOT IN (
+        SELECT keep.id FROM (
+            SELECT MIN(id) AS id FROM recipes_ingredientsamount
+            GROUP BY recipe_id, ingredient_id
+        ) keep
+    )
+'''
+
+
+def get_columns(cursor, table):
+    return {
+        column.name
+        for column in connection.introspection.get_table_description(
+            cursor, table
+        )
+    }
+
+
+def add_column(editor, model, field):
+    """Добавляет столбец в существующую таблицу.
+
+    В SQLite add_field пересоздает таблицу по текущей модели, вместе с
+    ограничениями и унаследованными связями многие ко многим, поэтому там
+    столбец добавляется обычным ALTER TABLE.
+    """
+    if connection.vendor != 'sqlite':
+        editor.add_field(model, field)
+        return
+    definition, params = editor.column_sql(model, field, include_default=True)
+    definition %= tuple(editor.quote_value(param) for param in params)
+    editor.execute(
+        'ALTER TABLE {table} ADD COLUMN {column} {definition}'.format(
+            table=editor.quote_name(model._meta.db_table),
+            column=editor.quote_name(field.column),
+            definition=definition,
+        )
+    )
+    editor.deferred_sql.extend(editor._field_indexes_sql(model, field))
+
+
+class Command(BaseCommand):
+    """Обновление схемы существующей базы до текущих моделей"""
+    help = ('Переносит ингредиенты рецептов из старой связи многие ко многим '
+            'в IngredientsAmount.recipe и добавляет недостающие таблицы, '
+            'столбцы, индексы и ограничения. Запускается перед migrate')
+
+    def handle(self, *args, **options):
+        tables = connection.introspection.table_names()
+        if Recipe._meta.db_table not in tables:
+            self.stdout.write('Схема еще не создана, обновление не нужно')
+            return
+        with connection.schema_editor() as editor:
+            if OLD_INGREDIENTS_TABLE in tables:
+                self.move_recipe_ingredients(editor)
+            self.add_missing(editor, tables)
+        self.stdout.write(self.style.SUCCESS(
+            'Схема обновлена. Выполните migrate, recount, '
+            'refresh_ingredient_vectors и refresh_recipe_scores'
+        ))
+
+    def move_recipe_ingredients(self, editor):
+        """Привязывает каждую строку IngredientsAmount к одному рецепту.
+
+        Строки, общие для нескольких рецептов, копируются, строки без
+        рецепта удаляются, повторы ингредиента в рецепте схлопываются.
+        """
+        field = IngredientsAmount._meta.get_field('recipe')
+        with connection.cursor() as cursor:
+            columns = get_columns(cursor, IngredientsAmount._meta.db_table)
+        nullable = models.ForeignKey(
+            Recipe, on_delete=models.CASCADE, null=True
+        )
+        nullable.set_attributes_from_name(field.name)
+        nullable.model = IngredientsAmount
+        if field.column not in columns:
+            add_column(editor, IngredientsAmount, nullable)
+        if connection.vendor == 'postgresql':
+            # Отложенные проверки внешних ключей мешают ALTER TABLE
+            # в той же транзакции.
+            editor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        for sql in (BACKFILL_RECIPE, COPY_SHARED_AMOUNTS, DELETE_ORPHANS,
+                    DELETE_DUPLICATES):
+            editor.execute(sql)
+        editor.alter_field(IngredientsAmount, nullable, field)
+        editor.execute(
+            f'DROP TABLE {editor.quote_name(OLD_INGREDIENTS_TABLE)}'
+        )
+        self.stdout.write('Ингредиенты рецептов перенесены')
+
+    def add_missing(self, editor, tables):
+        for app_label in UPGRADED_APPS:
+            for model in apps.get_app_config(app_label).get_models():
+                opts = model._meta
+                if opts.db_table not in tables:
+                    editor.create_model(model)
+                    self.stdout.write(f'Создана таблица {opts.db_table}')
+                    continue
+                with connection.cursor() as cursor:
+                    columns = get_columns(cursor, opts.db_table)
+                    constraints = connection.introspection.get_constraints(
+                        cursor, opts.db_table
+                    )
+                for field in opts.local_concrete_fields:
+                    if field.column not in columns:
+                        add_column(editor, model, field)
+                        self.stdout.write(
+                            f'Добавлен столбец {opts.db_table}.{field.column}'
+                        )
+                for index in opts.indexes:
+                    if index.name not in constraints:
+                        editor.add_index(model, index)
+                for constraint in opts.constraints:
+                    if constraint.name not in constraints:
+                        editor.add_constraint(model, constraint)
@@ -0,0 +1,177 @@
+import ipaddress
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from users.authentication import token_cache_stats
+
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+SQL_LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+)
+
+
+def fingerprint(sql):
+    """SQL без значений: одинаковые по форме запросы получают один ключ."""
+    for pattern, replacement in SQL_LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def is_allowed_address(address, allowed):
+    """Входит ли адрес в один из адресов или подсетей allowed."""
+    try:
+        address = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network.strip(), strict=False)
+        for network in allowed if network.strip()
+    )
+
+
+class QueryRecorder:
+    """Обертка execute_wrapper, считающая запросы и время в БД."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            if duration * 1000 >= settings.METRICS_SLOW_QUERY_MS:
+                self.slow.append((sql, duration))
+
+
+class EndpointStats:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.render_seconds = 0.0
+        self.duration_seconds = 0.0
+        self.buckets = [0] * (len(DURATION_BUCKETS) + 1)
+
+
+class SlowQueryStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+
+class MetricsRegistry:
+    """Метрики запросов к API в памяти процесса.
+
+    Собираются только для выборки запросов с долей METRICS_SAMPLE_RATE,
+    каждый воркер сервера хранит и отдает свои значения. Медленные
+    запросы группируются по отпечатку SQL, хранится не более
+    METRICS_SLOW_QUERY_LIMIT отпечатков.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.slow_queries = {}
+
+    def observe(self, endpoint, duration, render_duration, recorder):
+        with self._lock:
+            stats = self.endpoints.get(endpoint)
+            if stats is None:
+                stats = self.endpoints[endpoint] = EndpointStats()
+            stats.requests += 1
+            stats.queries += recorder.count
+            stats.db_seconds += recorder.duration
+            stats.render_seconds += render_duration
+            stats.duration_seconds += duration
+            stats.buckets[bisect_left(DURATION_BUCKETS, duration)] += 1
+            for sql, query_duration in recorder.slow:
+                self.observe_slow_query(sql, query_duration)
+
+    def observe_slow_query(self, sql, duration):
+        key = fingerprint(sql)
+        stats = self.slow_queries.get(key)
+        if stats is None:
+            if len(self.slow_queries) >= settings.METRICS_SLOW_QUERY_LIMIT:
+                return
+            stats = self.slow_queries[key] = SlowQueryStats(key)
+        stats.count += 1
+        stats.total_seconds += duration
+        stats.max_seconds = max(stats.max_seconds, duration)
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        lines = [
+            '# TYPE foodgram_metrics_sample_rate gauge',
+            f'foodgram_metrics_sample_rate {settings.METRICS_SAMPLE_RATE}',
+        ]
+        with self._lock:
+            endpoints = sorted(self.endpoints.items())
+            slow_queries = sorted(
+                self.slow_queries.values(),
+                key=lambda stats: stats.total_seconds, reverse=True
+            )
+            lines.extend(self.render_endpoints(endpoints))
+            lines.extend(self.render_slow_queries(slow_queries))
+        lines.extend((
+            '# TYPE foodgram_token_cache_hits_total counter',
+            f'foodgram_token_cache_hits_total {token_cache_stats.hits}',
+            '# TYPE foodgram_token_cache_misses_total counter',
+            f'foodgram_token_cache_misses_total {token_cache_stats.misses}',
+        ))
+        return '\n'.join(lines) + '\n'
+
+    def render_endpoints(self, endpoints):
+        counters = (
+            ('requests_total', 'requests'),
+            ('db_queries_total', 'queries'),
+            ('db_seconds_total', 'db_seconds'),
+            ('render_seconds_total', 'render_seconds'),
+        )
+        for name, attr in counters:
+            yield f'# TYPE foodgram_endpoint_{name} counter'
+            for endpoint, stats in endpoints:
+                yield (f'foodgram_endpoint_{name}{{endpoint="{endpoint}"}} '
+                       f'{getattr(stats, attr)}')
+        yield '# TYPE foodgram_endpoint_duration_seconds histogram'
+        for endpoint, stats in endpoints:
+            label = f'endpoint="{endpoint}"'
+            cumulative = 0
+            for bound, count in zip(DURATION_BUCKETS + ('+Inf',),
+                                    stats.buckets):
+                cumulative += count
+                yield (f'foodgram_endpoint_duration_seconds_bucket'
+                       f'{{{label},le="{bound}"}} {cumulative}')
+            yield (f'foodgram_endpoint_duration_seconds_sum{{{label}}} '
+                   f'{stats.duration_seconds}')
+            yield (f'foodgram_endpoint_duration_seconds_count{{{label}}} '
+                   f'{stats.requests}')
+
+    def render_slow_queries(self, slow_queries):
+        for name, attr in (('count', 'count'),
+                           ('seconds_total', 'total_seconds'),
+                           ('max_seconds', 'max_seconds')):
+            metric_type = 'gauge' if name == 'max_seconds' else 'counter'
+            yield f'# TYPE foodgram_slow_query_{name} {metric_type}'
+            for stats in slow_queries:
+                sql = stats.sql.replace('\\', '\\\\').replace('"', '\\"')
+                yield (f'foodgram_slow_query_{name}{{sql="{sql}"}} '
+                       f'{getattr(stats, attr)}')
+
+
+metrics_registry = MetricsRegistry()
@@ -0,0 +1,64 @@
+import random
+import time
+
+from api.metrics import QueryRecorder, metrics_registry
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+
+def get_endpoint(request):
+    """Метод и имя маршрута, например GET api:recipes-list."""
+    match = request.resolver_match
+    view_name = match.view_name if match is not None else 'unresolved'
+    return f'{request.method} {view_name}'
+
+
+class InstrumentationMiddleware:
+    """Замеры числа SQL-запросов, времени в БД и отрисовки ответа.
+
+    Включается настройкой METRICS_ENABLED и замеряет только долю
+    METRICS_SAMPLE_RATE запросов, остальные проходят без накладных
+    расходов. Замеренный ответ получает заголовок Server-Timing,
+    а сводные значения доступны по адресу /api/metrics/.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            return self.get_response(request)
+        request._render_seconds = 0.0
+        recorder = QueryRecorder()
+        # Представления под ASGI работают с БД из своего пула потоков
+        # и подключают счетчик сами, см. api.async_views.render_response
+        request._query_recorder = recorder
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        render_duration = request._render_seconds
+        metrics_registry.observe(
+            get_endpoint(request), duration, render_duration, recorder
+        )
+        response['Server-Timing'] = (
+            f'db;desc="{recorder.count} queries";'
+            f'dur={recorder.duration * 1000:.1f}, '
+            f'render;dur={render_duration * 1000:.1f}, '
+            f'total;dur={duration * 1000:.1f}'
+        )
+        return response
+
+    def process_template_response(self, request, response):
+        if not hasattr(request, '_render_seconds'):
+            return response
+        started = time.perf_counter()
+
+        def record_render(rendered):
+            request._render_seconds = time.perf_counter() - started
+
+        response.add_post_render_callback(record_render)
+        return response
@@ -0,0 +1,13 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class ExportContentNegotiation(DefaultContentNegotiation):
+    """Согласование формата для выгрузок файлов.
+
+    Параметр ?format= в выгрузках выбирает формат файла, а не рендерер DRF,
+    поэтому ответы с ошибками всегда отдаются первым рендерером.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        renderer = renderers[0]
+        return renderer, renderer.media_type
@@ -1,6 +1,51 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipeCursorPagination(CursorPagination):
+    """Постраничный вывод по курсору без OFFSET и COUNT(*)."""
+    page_size = 6
+    page_size_query_param = 'limit'
+    ordering = ('-created', '-id')
 
 
 class ForPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class RecipePagination(ForPageNumberPagination):
+    """Постраничный вывод рецептов по номеру страницы.
+
+    Запрос с параметром pagination=cursor или cursor переключается на
+    RecipeCursorPagination, а обычные параметры page и limit работают
+    как прежде. Сортировка ?ordering= и поиск ?search= выводятся только
+    по номерам страниц, так как курсор строится по дате публикации.
+    """
+    cursor_pagination_class = RecipeCursorPagination
+
+    def use_cursor(self, request):
+        if {'ordering', 'search'} & request.query_params.keys():
+            return False
+        return (request.query_params.get('pagination') == 'cursor'
+                or 'cursor' in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class RankedPageNumberPagination(PageNumberPagination):
+    """Постраничный вывод ранжированных списков, которые не упорядочены
+    по дате и поэтому не выводятся по курсору."""
+    page_size = 6
+    page_size_query_param = 'limit'
@@ -0,0 +1,196 @@
+import heapq
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+from itertools import chain
+
+from django.conf import settings
+from django.db import connections
+from recipes.models import IngredientsAmount
+
+logger = logging.getLogger(__name__)
+
+
+def grow(values, size):
+    """Дополняет массив нулями до длины size."""
+    if size > len(values):
+        values.frombytes(bytes(values.itemsize * (size - len(values))))
+
+
+class RecipeMatches:
+    """Рецепты, отсортированные по числу недостающих ингредиентов.
+
+    Поддерживает len() и срезы, поэтому подходит для постраничного
+    вывода. Сортируется только начало списка до конца запрошенной
+    страницы.
+    """
+
+    def __init__(self, matched, totals):
+        self.matched = matched
+        self.totals = totals
+
+    def __len__(self):
+        return len(self.matched)
+
+    def __getitem__(self, page):
+        ranked = heapq.nsmallest(
+            page.stop, self.matched.items(),
+            key=lambda item: (
+                self.totals[item[0]] - item[1], -item[1], -item[0]
+            )
+        )
+        return [
+            (recipe_id, matched, self.totals[recipe_id] - matched)
+            for recipe_id, matched in ranked[page]
+        ]
+
+
+class RecipeIngredientIndex:
+    """Обратный индекс ингредиентов в памяти процесса.
+
+    Для каждого ингредиента хранится отсортированный массив id рецептов,
+    для каждого рецепта - число его ингредиентов в массиве, индексом
+    которого служит id рецепта. Индекс обновляется при создании,
+    изменении и удалении рецептов через API и целиком перечитывается не
+    реже, чем раз в RECIPE_INGREDIENT_INDEX_TTL секунд, чтобы изменения
+    из других процессов и админки не терялись.
+
+    Перечитывание идет в фоновом потоке без блокировки, запросы в это
+    время работают со старым индексом. Изменения, пришедшие во время
+    построения, запоминаются и применяются к новому индексу перед
+    подменой.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._state = None
+        self._pending = None
+        self._loaded_at = 0
+
+    def invalidate(self):
+        self._loaded_at = 0
+
+    def _build(self):
+        postings = defaultdict(list)
+        totals = array('H')
+        amounts = IngredientsAmount.objects.order_by().values_list(
+            'ingredient_id', 'recipe_id'
+        )
+        for ingredient_id, recipe_id in amounts.iterator():
+            postings[ingredient_id].append(recipe_id)
+            grow(totals, recipe_id + 1)
+            totals[recipe_id] += 1
+        postings = {
+            ingredient_id: array('q', sorted(recipe_ids))
+            for ingredient_id, recipe_ids in postings.items()
+        }
+        return postings, totals
+
+    def _reload(self):
+        """Строит индекс без блокировки и подменяет им текущий."""
+        with self._lock:
+            if self._pending is not None:
+                return
+            self._pending = []
+        try:
+            state = self._build()
+        except Exception:
+            with self._lock:
+                self._pending = None
+                self._loaded_at = time.monotonic()
+            raise
+        with self._lock:
+            for recipe_id, ingredient_ids in self._pending:
+                self._apply(state, recipe_id, ingredient_ids)
+            self._state = state
+            self._pending = None
+            self._loaded_at = time.monotonic()
+
+    def _reload_in_worker(self):
+        try:
+            self._reload()
+        except Exception:
+            logger.exception(
+                'Не удалось перечитать индекс ингредиентов рецептов'
+            )
+        finally:
+            connections.close_all()
+
+    def _get_state(self):
+        state = self._state
+        if state is None:
+            with self._load_lock:
+                if self._state is None:
+                    self._reload()
+            return self._state
+        expired = (
+            time.monotonic() - self._loaded_at
+            > settings.RECIPE_INGREDIENT_INDEX_TTL
+        )
+        if expired and self._pending is None:
+            threading.Thread(
+                target=self._reload_in_worker, daemon=True,
+                name='recipe-ingredient-index'
+            ).start()
+        return state
+
+    @staticmethod
+    def _apply(state, recipe_id, ingredient_ids):
+        """Заменяет ингредиенты рецепта; None удаляет рецепт."""
+        postings, totals = state
+        if recipe_id < len(totals) and totals[recipe_id]:
+            for recipe_ids in postings.values():
+                index = bisect_left(recipe_ids, recipe_id)
+                if index < len(recipe_ids) and recipe_ids[index] == recipe_id:
+                    del recipe_ids[index]
+            totals[recipe_id] = 0
+        if ingredient_ids is None:
+            return
+        grow(totals, recipe_id + 1)
+        for ingredient_id in ingredient_ids:
+            insort(
+                postings.setdefault(ingredient_id, array('q')), recipe_id
+            )
+        totals[recipe_id] = len(ingredient_ids)
+
+    def _change(self, recipe_id, ingredient_ids):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((recipe_id, ingredient_ids))
+            if self._state is not None:
+                self._apply(self._state, recipe_id, ingredient_ids)
+
+    def update_recipe(self, recipe_id, ingredient_ids):
+        """Заменяет ингредиенты рецепта в индексе."""
+        self._change(recipe_id, ingredient_ids)
+
+    def remove_recipe(self, recipe_id):
+        self._change(recipe_id, None)
+
+    def match(self, ingredient_ids, max_missing=None):
+        """Рецепты хотя бы с одним из ингредиентов ingredient_ids.
+
+        Совпадения считаются по объединению массивов рецептов этих
+        ингредиентов, без обращения к БД. max_missing отбрасывает
+        рецепты, которым не хватает больше ингредиентов.
+        """
+        state = self._get_state()
+        postings, totals = state
+        with self._lock:
+            matched = Counter(chain.from_iterable(
+                postings.get(ingredient_id, ())
+                for ingredient_id in set(ingredient_ids)
+            ))
+        if max_missing is not None:
+            matched = {
+                recipe_id: count for recipe_id, count in matched.items()
+                if totals[recipe_id] - count <= max_missing
+            }
+        return RecipeMatches(matched, totals)
+
+
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -1,21 +1,65 @@
 import base64
+import binascii
+import tempfile
+from uuid import uuid4
 
+from api.recipe_index import recipe_ingredient_index
+from api.viewer_state import get_viewer_state
 from django.conf import settings
-from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
-from recipes.models import (Favorite, Ingredient, IngredientsAmount, Recipe,
-                            ShoppingCart, Tag)
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+from recipes.models import Ingredient, IngredientsAmount, Recipe, Tag
 from rest_framework import serializers
 from users.serializers import UserActionGetSerializer
 
 
 class Base64ImageField(serializers.ImageField):
+    """Картинка в виде data URL с base64.
+
+    Данные декодируются частями во временный файл, формат определяется
+    по содержимому с помощью Pillow, а не по заявленному MIME-типу.
+    """
+    ALLOWED_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif',
+                       'WEBP': 'webp'}
+    CHUNK_SIZE = 64 * 1024
+
+    def decode(self, encoded):
+        file = tempfile.SpooledTemporaryFile(
+            max_size=settings.IMAGE_SPOOL_MAX_SIZE
+        )
+        try:
+            for start in range(0, len(encoded), self.CHUNK_SIZE):
+                file.write(base64.b64decode(
+                    encoded[start:start + self.CHUNK_SIZE], validate=True
+                ))
+        except binascii.Error:
+            file.close()
+            self.fail('invalid_image')
+        file.seek(0)
+        return file
+
     def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-        return super().to_internal_value(data)
+        if not (isinstance(data, str) and data.startswith('data:image')):
+            return super().to_internal_value(data)
+        if ';base64,' not in data:
+            self.fail('invalid_image')
+        file = self.decode(data.split(';base64,', 1)[1])
+        try:
+            with Image.open(file) as image:
+                image_format = image.format
+                image.verify()
+        except Exception:
+            file.close()
+            self.fail('invalid_image')
+        if image_format not in self.ALLOWED_FORMATS:
+            file.close()
+            self.fail('invalid_image')
+        file.seek(0)
+        return File(
+            file, name=f'{uuid4().hex}.{self.ALLOWED_FORMATS[image_format]}'
+        )
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -49,42 +93,66 @@ class RecipeSerializer(serializers.ModelSerializer):
     """Класс рецептов."""
     author = serializers.SerializerMethodField()
     tags = TagSerializer(many=True, read_only=True)
-    ingredients = IngredientsAmountSerializer(many=True, read_only=True)
+    ingredients = IngredientsAmountSerializer(
+        source='ingredient_amounts', many=True, read_only=True
+    )
     is_favorited = serializers.SerializerMethodField(read_only=True)
     is_in_shopping_cart = serializers.SerializerMethodField(read_only=True)
     image = Base64ImageField(required=True)
+    image_renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time',)
+                  'is_in_shopping_cart', 'name', 'image', 'image_renditions',
+                  'text', 'cooking_time',)
+
+    def get_image_renditions(self, value):
+        """Ссылки на уменьшенные копии картинки.
+
+        Пока копии не построены, все ссылки ведут на исходную картинку.
+        """
+        request = self.context['request']
+        renditions = value.image_renditions
+        if not value.image:
+            return {}
+        if renditions.get('source') != value.image.name:
+            url = request.build_absolute_uri(value.image.url)
+            return {
+                key: url for name in settings.IMAGE_RENDITIONS
+                for key in (name, f'{name}_webp')
+            }
+        return {
+            key: request.build_absolute_uri(default_storage.url(path))
+            for key, path in renditions.items() if key != 'source'
+        }
 
     def get_author(self, value):
         request = self.context['request']
         author = value.author
+        if hasattr(value, 'is_subscribed_to_author'):
+            author.is_subscribed = value.is_subscribed_to_author
         context = {'request': request}
         serializer = UserActionGetSerializer(author, context=context)
         return serializer.data
 
-    def favorited_or_in_shopping_cart(self, value, obj):
-        user = self.context['request'].user
-        if user.is_authenticated:
-            object = obj.objects.filter(recipe=value, user=user)
-            return object.exists()
-        return False
-
     def get_is_favorited(self, value):
-        return self.favorited_or_in_shopping_cart(value, obj=Favorite)
+        if hasattr(value, 'is_favorited'):
+            return value.is_favorited
+        viewer_state = get_viewer_state(self.context['request'])
+        return viewer_state.is_favorited(value.pk)
 
     def get_is_in_shopping_cart(self, value):
-        return self.favorited_or_in_shopping_cart(value, obj=ShoppingCart)
+        if hasattr(value, 'is_in_shopping_cart'):
+            return value.is_in_shopping_cart
+        viewer_state = get_viewer_state(self.context['request'])
+        return viewer_state.is_in_shopping_cart(value.pk)
 
 
 class AddIngredientSerializer(serializers.ModelSerializer):
     """Вспомогательный сериализатор для RecipeCreateSerializer."""
 
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = serializers.IntegerField()
 
     class Meta:
         model = IngredientsAmount
@@ -94,10 +162,7 @@ class AddIngredientSerializer(serializers.ModelSerializer):
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Класс создания рецептов."""
     author = serializers.SerializerMethodField()
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     image = Base64ImageField(required=True)
     ingredients = AddIngredientSerializer(many=True)
 
@@ -107,93 +172,153 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                   'text', 'cooking_time',)
 
     def validate_ingredients(self, value):
+        """Проверяет все ингредиенты одним запросом к БД.
+
+        Ошибки возвращаются списком по позициям переданных ингредиентов.
+        """
         ingredients = value
         if not ingredients:
             raise serializers.ValidationError(
                 'Количество ингредиентов должно быть больше 0'
             )
-        ingredient_list = []
+        found = Ingredient.objects.in_bulk(
+            {ingredient_item['id'] for ingredient_item in ingredients}
+        )
+        errors = []
+        seen = set()
         for ingredient_item in ingredients:
-            ingredient = get_object_or_404(Ingredient,
-                                           name=ingredient_item['id'])
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError(
-                    'Этот ингредиент уже добавлен'
-                )
-            ingredient_list.append(ingredient)
+            ingredient_id = ingredient_item['id']
+            if ingredient_id not in found:
+                errors.append({'id': ['Такого ингредиента не существует']})
+            elif ingredient_id in seen:
+                errors.append({'id': ['Этот ингредиент уже добавлен']})
+            else:
+                errors.append({})
+            seen.add(ingredient_id)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for ingredient_item in ingredients:
+            ingredient_item['id'] = found[ingredient_item['id']]
         return value
 
     def validate_tags(self, value):
+        """Проверяет все тэги одним запросом к БД.
+
+        Ошибки возвращаются словарем с позициями переданных тэгов.
+        """
         tags = value
         if not tags:
             raise serializers.ValidationError(
                 'Количество тегов должно быть больше 0'
             )
-        tags_list = []
-        for tag in tags:
-            if tag in tags_list:
-                raise serializers.ValidationError('Тег уже выбран')
-            tags_list.append(tag)
-        return value
+        found = Tag.objects.in_bulk(set(tags))
+        errors = {}
+        seen = set()
+        for index, tag_id in enumerate(tags):
+            if tag_id not in found:
+                errors[index] = ['Такого тега не существует']
+            elif tag_id in seen:
+                errors[index] = ['Тег уже выбран']
+            seen.add(tag_id)
+        if errors:
+            raise serializers.ValidationError(errors)
+        return [found[tag_id] for tag_id in tags]
 
     def validate_cooking_time(self, value):
         if value >= settings.MIN_COOKING_TIME:
             return value
         raise serializers.ValidationError('Время готовки должно быть больше 0')
 
-    def add_tags(self, tags, recipe):
-        for tag in tags:
-            recipe.tags.add(tag)
-
-    def add_ingredients(self, ingredients):
+    def add_ingredients(self, ingredients, recipe):
         new_ingredients = [IngredientsAmount(
+            recipe=recipe,
             ingredient=ingredient['id'],
             amount=ingredient['amount'],
         ) for ingredient in ingredients]
         IngredientsAmount.objects.bulk_create(new_ingredients)
 
+    def update_ingredients(self, ingredients, recipe):
+        """Приводит ингредиенты рецепта к новому списку.
+
+        Удаляет, обновляет и добавляет только изменившиеся строки.
+        """
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {
+            ingredient_amount.ingredient_id: ingredient_amount
+            for ingredient_amount in recipe.ingredient_amounts.all()
+        }
+        removed = current.keys() - amounts.keys()
+        if removed:
+            recipe.ingredient_amounts.filter(
+                ingredient_id__in=removed
+            ).delete()
+        changed = []
+        for ingredient_id, ingredient_amount in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and ingredient_amount.amount != amount:
+                ingredient_amount.amount = amount
+                changed.append(ingredient_amount)
+        IngredientsAmount.objects.bulk_update(changed, ('amount',))
+        self.add_ingredients(
+            [ingredient for ingredient in ingredients
+             if ingredient['id'].id not in current],
+            recipe
+        )
+
+    def refresh_ingredients_index(self, recipe):
+        """Обновляет вектор ингредиентов и обратный индекс рецепта."""
+        recipe.refresh_ingredient_vector()
+        recipe_id = recipe.pk
+        ingredient_ids = [
+            ingredient_id for ingredient_id, _ in recipe.ingredient_vector
+        ]
+        transaction.on_commit(lambda: recipe_ingredient_index.update_recipe(
+            recipe_id, ingredient_ids
+        ))
+
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('ingredients')
         recipe = Recipe.objects.create(**validated_data)
-        self.add_tags(tags, recipe)
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredient_id = ingredient.get('id')
-            amount = ingredient.get('amount')
-            ingredient_amount = (IngredientsAmount.objects.create(
-                ingredient=ingredient_id, amount=amount
-            ))
-            ingredients_list.append(ingredient_amount)
-        recipe.ingredients.set(ingredients_list)
-        recipe.save()
+        recipe.tags.set(tags)
+        self.add_ingredients(ingredients, recipe)
+        self.refresh_ingredients_index(recipe)
         return recipe
 
     def update(self, instance, validated_data):
-        recipe = instance
         instance.image = validated_data.get('image', instance.image)
         instance.name = validated_data.get('name', instance.name)
-        instance.text = validated_data.get('text', instance.name)
+        instance.text = validated_data.get('text', instance.text)
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
-        instance.tags.clear()
-        instance.ingredients.clear()
-        self.add_tags(validated_data.pop('tags'), recipe)
-        ingredients = validated_data.get('ingredients')
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredient_id = ingredient.get('id')
-            amount = ingredient.get('amount')
-            ingredient_amount = (IngredientsAmount.objects.create(
-                ingredient=ingredient_id, amount=amount
-            ))
-            ingredients_list.append(ingredient_amount)
-        recipe.ingredients.set(ingredients_list)
+        if 'tags' in validated_data:
+            instance.tags.set(validated_data['tags'])
+        if 'ingredients' in validated_data:
+            self.update_ingredients(validated_data['ingredients'], instance)
+            self.refresh_ingredients_index(instance)
         instance.save()
         return instance
 
     def to_representation(self, instance):
         request = self.context.get('request')
         context = {'request': request}
+        instance = Recipe.objects.with_related().with_user_flags(
+            request.user
+        ).get(pk=instance.pk)
         return RecipeSerializer(instance, context=context).data
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетных операций."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.BATCH_MAX_SIZE
+    )
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,128 @@
+from collections import Counter
+
+from api.caching import get_cache_version
+from api.viewer_state import invalidate_viewer_state
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.signals import count_subquery
+from recipes.units import normalize_unit
+
+
+def get_tag_ids(slugs):
+    """Идентификаторы тэгов по слагам без запроса к БД.
+
+    Соответствие слагов и идентификаторов хранится в кеше под текущей
+    версией тэгов и перестраивается после изменения любого тэга.
+    """
+    key = f'api:tags:{get_cache_version("tags")}:slug_ids'
+    slug_ids = cache.get(key)
+    if slug_ids is None:
+        slug_ids = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(key, slug_ids, settings.API_CACHE_TIMEOUT)
+    return [slug_ids[slug] for slug in slugs if slug in slug_ids]
+
+
+def get_shopping_list(user):
+    """Сводный список ингредиентов из корзины пользователя.
+
+    Складывает предрассчитанные векторы ингредиентов рецептов корзины
+    в памяти, не соединяя строки IngredientsAmount. Количества одного
+    ингредиента в кратных единицах (г и кг, мл и л) приводятся к базовой
+    единице и выводятся одной строкой. Строки упорядочены по названию
+    и единице измерения.
+    """
+    totals = Counter()
+    for vector in Recipe.objects.filter(
+        recipe_in_shopping_cart__user=user
+    ).values_list('ingredient_vector', flat=True):
+        for ingredient_id, amount in vector:
+            totals[ingredient_id] += amount
+    shopping_list = Counter()
+    for ingredient_id, name, measurement_unit in Ingredient.objects.filter(
+        pk__in=totals
+    ).values_list('id', 'name', 'measurement_unit'):
+        base_unit, _ = normalize_unit(measurement_unit)
+        shopping_list[name, base_unit] += totals[ingredient_id]
+    return [
+        {'name': name, 'measurement_unit': measurement_unit, 'amount': amount}
+        for (name, measurement_unit), amount in sorted(shopping_list.items())
+    ]
+
+
+class RelationToggle:
+    """Связь пользователя с объектом: избранное, корзина или подписка.
+
+    Добавление полагается на ограничение уникальности в БД, поэтому
+    одновременные повторные запросы не приводят к IntegrityError в ответе.
+    Удаление выполняется по фильтру без предварительной проверки.
+    Пакетные добавление и удаление обходят сигналы модели, поэтому сами
+    пересчитывают счетчик counter у объектов одним UPDATE и один раз
+    сбрасывают кеш viewer_state.
+    """
+
+    def __init__(self, model, field, counter, viewer_state):
+        self.model = model
+        self.field = field
+        self.counter = counter
+        self.viewer_state = viewer_state
+
+    @property
+    def target_model(self):
+        return self.model._meta.get_field(self.field).related_model
+
+    def add(self, user, target):
+        """Создает связь; False, если она уже существует."""
+        try:
+            with transaction.atomic():
+                self.model.objects.create(user=user, **{self.field: target})
+        except IntegrityError:
+            return False
+        return True
+
+    def remove(self, user, target_id):
+        """Удаляет связь; False, если ее не было."""
+        deleted, _ = self.model.objects.filter(
+            user=user, **{f'{self.field}_id': target_id}
+        ).delete()
+        return deleted > 0
+
+    def get_existing(self, user, target_ids):
+        return set(self.model.objects.filter(
+            user=user, **{f'{self.field}_id__in': target_ids}
+        ).values_list(f'{self.field}_id', flat=True))
+
+    def add_many(self, user, target_ids):
+        """Создает связи одним INSERT и возвращает добавленные id."""
+        with transaction.atomic():
+            existing = self.get_existing(user, target_ids)
+            added = [pk for pk in target_ids if pk not in existing]
+            self.model.objects.bulk_create(
+                [self.model(user=user, **{f'{self.field}_id': pk})
+                 for pk in added],
+                ignore_conflicts=True
+            )
+            # Параллельный запрос мог вставить часть строк раньше, и
+            # ignore_conflicts их пропустил, поэтому счетчики не
+            # увеличиваются, а пересчитываются
+            self.target_model.objects.filter(pk__in=added).update(**{
+                self.counter: count_subquery(self.model, self.field)
+            })
+            invalidate_viewer_state(user.pk, self.viewer_state)
+        return added
+
+    def remove_many(self, user, target_ids):
+        """Удаляет связи одним DELETE и возвращает удаленные id."""
+        with transaction.atomic():
+            removed = self.get_existing(user, target_ids)
+            relations = self.model.objects.filter(
+                user=user, **{f'{self.field}_id__in': removed}
+            )
+            # DELETE без выборки строк для сигналов post_delete
+            relations._raw_delete(relations.db)
+            self.target_model.objects.filter(pk__in=removed).update(**{
+                self.counter: count_subquery(self.model, self.field)
+            })
+            invalidate_viewer_state(user.pk, self.viewer_state)
+        return removed
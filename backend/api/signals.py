@@ -0,0 +1,43 @@
+from api.caching import bump_cache_version
+from api.ingredient_index import ingredient_index
+from api.recipe_index import recipe_ingredient_index
+from api.viewer_state import invalidate_viewer_state
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from users.models import Subscription
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients(sender, **kwargs):
+    ingredient_index.invalidate()
+    bump_cache_version('ingredients')
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_index(sender, instance, **kwargs):
+    recipe_id = instance.pk
+    transaction.on_commit(
+        lambda: recipe_ingredient_index.remove_recipe(recipe_id)
+    )
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags(sender, **kwargs):
+    bump_cache_version('tags')
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+def invalidate_favorites(sender, instance, **kwargs):
+    invalidate_viewer_state(instance.user_id, 'favorites')
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_shopping_cart(sender, instance, **kwargs):
+    invalidate_viewer_state(instance.user_id, 'shopping_cart')
+
+
+@receiver((post_save, post_delete), sender=Subscription)
+def invalidate_subscriptions(sender, instance, **kwargs):
+    invalidate_viewer_state(instance.user_id, 'subscriptions')
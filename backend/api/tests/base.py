@@ -0,0 +1,73 @@
+import shutil
+import tempfile
+
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientsAmount, Recipe, Tag
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_WORKERS=0)
+class APITestCase(TestCase):
+    """Общие данные для тестов API: пользователи, теги и ингредиенты."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = cls.create_user('cook')
+        cls.author = cls.create_user('author')
+        cls.tags = [
+            Tag.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in (
+                ('Завтрак', '#E26C2D', 'breakfast'),
+                ('Обед', '#49B64E', 'lunch'),
+                ('Ужин', '#8775D2', 'dinner'),
+            )
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(5)
+        ]
+
+    def setUp(self):
+        self.anon_client = APIClient()
+        self.user_client = APIClient()
+        self.user_client.force_authenticate(self.user)
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password='secret-password',
+            first_name=username,
+            last_name=username,
+        )
+
+    @classmethod
+    def create_recipe(cls, author=None, tags=(), ingredients=(),
+                      name='рецепт', image='recipes/images/test.png',
+                      text='описание'):
+        recipe = Recipe.objects.create(
+            author=author or cls.author,
+            name=name,
+            text=text,
+            cooking_time=10,
+            image=image,
+        )
+        recipe.tags.set(tags)
+        IngredientsAmount.objects.bulk_create(
+            IngredientsAmount(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients
+        )
+        recipe.refresh_ingredient_vector()
+        return recipe
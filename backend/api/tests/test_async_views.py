@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from api.async_views import render_response
+from api.metrics import QueryRecorder
+from recipes.models import Tag
+
+
+def count_tags(request):
+    return HttpResponse(str(Tag.objects.count()))
+
+
+class RenderResponseTests(SimpleTestCase):
+    databases = {'default'}
+
+    def test_queries_in_worker_thread_are_recorded(self):
+        request = RequestFactory().get('/api/tags/')
+        request._query_recorder = QueryRecorder()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            response = executor.submit(
+                render_response, count_tags, request
+            ).result()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(request._query_recorder.count, 1)
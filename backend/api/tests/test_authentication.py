@@ -0,0 +1,64 @@
+import tempfile
+
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.tests.base import APITestCase
+from users.authentication import (CachedTokenAuthentication,
+                                  get_token_cache_key)
+
+SHARED_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(),
+    }
+}
+
+
+@override_settings(CACHES=SHARED_CACHE)
+class CachedTokenAuthenticationTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def test_hit_and_miss_return_token(self):
+        authentication = CachedTokenAuthentication()
+        for _ in range(2):
+            user, auth = authentication.authenticate_credentials(
+                self.token.key
+            )
+            self.assertEqual(user, self.user)
+            self.assertIsInstance(auth, Token)
+            self.assertEqual(auth.key, self.token.key)
+
+    def test_cached_request_skips_token_query(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        with self.assertNumQueries(0):
+            authentication = CachedTokenAuthentication()
+            authentication.authenticate_credentials(self.token.key)
+
+    def test_logout_evicts_token(self):
+        self.client.get('/api/users/me/')
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertIsNone(cache.get(get_token_cache_key(self.token.key)))
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_deactivation_evicts_token(self):
+        self.client.get('/api/users/me/')
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    @override_settings(CACHES={'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }})
+    def test_process_local_cache_is_bypassed(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        self.assertIsNone(cache.get(get_token_cache_key(self.token.key)))
@@ -0,0 +1,30 @@
+from unittest import mock
+
+from django.core.cache import cache
+
+from api.tests.base import APITestCase
+
+
+class IngredientCacheTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def test_search_by_name_is_not_stored(self):
+        with mock.patch('api.caching.cache.set') as cache_set:
+            response = self.anon_client.get('/api/ingredients/?name=ингр')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), len(self.ingredients))
+        cache_set.assert_not_called()
+        response = self.anon_client.get(
+            '/api/ingredients/?name=ингр',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_full_list_is_stored(self):
+        with mock.patch('api.caching.cache.set') as cache_set:
+            response = self.anon_client.get('/api/ingredients/')
+        self.assertEqual(response.status_code, 200)
+        cache_set.assert_called_once()
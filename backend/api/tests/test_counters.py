@@ -0,0 +1,54 @@
+from recipes.models import Favorite, Recipe
+from users.models import User
+
+from api.tests.base import APITestCase
+
+
+class CounterFieldsTests(APITestCase):
+
+    def test_recipe_save_keeps_favorites_count(self):
+        recipe = self.create_recipe(
+            tags=self.tags[:1], ingredients=self.ingredients[:1]
+        )
+        stale = Recipe.objects.get(pk=recipe.pk)
+        for user in (self.user, self.author, self.create_user('fan')):
+            Favorite.objects.create(user=user, recipe=recipe)
+        stale.name = 'новое название'
+        stale.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'новое название')
+        self.assertEqual(recipe.favorites_count, 3)
+
+    def test_recipe_partial_update_keeps_favorites_count(self):
+        recipe = self.create_recipe(
+            author=self.user, tags=self.tags[:1],
+            ingredients=self.ingredients[:1]
+        )
+        for user in (self.user, self.author, self.create_user('fan')):
+            Favorite.objects.create(user=user, recipe=recipe)
+        response = self.user_client.patch(
+            f'/api/recipes/{recipe.pk}/',
+            {
+                'ingredients': [
+                    {'id': self.ingredients[1].pk, 'amount': 5}
+                ],
+                'tags': [self.tags[1].pk],
+                'name': 'другое',
+                'text': 'текст',
+                'cooking_time': 5,
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 3)
+
+    def test_set_password_keeps_recipes_count(self):
+        stale = User.objects.get(pk=self.author.pk)
+        self.create_recipe(tags=self.tags[:1])
+        self.create_recipe(tags=self.tags[:1])
+        stale.set_password('new-secret-password')
+        stale.save()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 2)
+        self.assertTrue(self.author.check_password('new-secret-password'))
@@ -0,0 +1,57 @@
+from django.core.cache import cache
+
+from api.tests.base import APITestCase
+from recipes.models import Favorite, ShoppingCart
+
+
+class RecipeFilterTests(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        breakfast, lunch, dinner = cls.tags
+        cls.both = cls.create_recipe(tags=(breakfast, lunch), name='оба')
+        cls.breakfast = cls.create_recipe(tags=(breakfast,), name='завтрак')
+        cls.dinner = cls.create_recipe(tags=(dinner,), name='ужин')
+        for recipe in (cls.both, cls.breakfast, cls.dinner):
+            Favorite.objects.create(user=cls.user, recipe=recipe)
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.both)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get_ids(self, client, query):
+        response = client.get(f'/api/recipes/?limit=100&{query}')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_tags_without_duplicates(self):
+        ids = self.get_ids(self.anon_client, 'tags=breakfast&tags=lunch')
+        self.assertEqual(sorted(ids), sorted([self.both.pk,
+                                              self.breakfast.pk]))
+
+    def test_tags_with_favorited(self):
+        ids = self.get_ids(
+            self.user_client, 'tags=breakfast&tags=lunch&is_favorited=1'
+        )
+        self.assertEqual(sorted(ids), sorted([self.both.pk,
+                                              self.breakfast.pk]))
+
+    def test_tags_with_favorited_and_shopping_cart(self):
+        ids = self.get_ids(
+            self.user_client,
+            'tags=breakfast&tags=lunch&is_favorited=1&is_in_shopping_cart=1'
+        )
+        self.assertEqual(ids, [self.both.pk])
+
+    def test_unknown_slugs(self):
+        self.assertEqual(self.get_ids(self.anon_client, 'tags=unknown'), [])
+        ids = self.get_ids(self.anon_client, 'tags=unknown&tags=dinner')
+        self.assertEqual(ids, [self.dinner.pk])
+
+    def test_anonymous_user_flags(self):
+        for query in ('is_favorited=1', 'is_in_shopping_cart=1',
+                      'tags=breakfast&is_favorited=1'):
+            with self.subTest(query=query):
+                self.assertEqual(self.get_ids(self.anon_client, query), [])
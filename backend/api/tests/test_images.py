@@ -0,0 +1,98 @@
+import base64
+import io
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.serializers import Base64ImageField
+from api.tests.base import APITestCase
+from recipes.models import Recipe
+
+
+def encode_image(image_format, mime='image/png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'red').save(buffer, image_format)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:{mime};base64,{encoded}'
+
+
+class Base64ImageFieldTests(APITestCase):
+
+    def assert_invalid(self, data):
+        with self.assertRaises(ValidationError):
+            Base64ImageField().to_internal_value(data)
+
+    def test_format_is_taken_from_content(self):
+        file = Base64ImageField().to_internal_value(
+            encode_image('JPEG', mime='image/png')
+        )
+        self.assertTrue(file.name.endswith('.jpg'))
+        with Image.open(file) as image:
+            self.assertEqual(image.format, 'JPEG')
+
+    def test_spoofed_mime_with_disallowed_format(self):
+        self.assert_invalid(encode_image('BMP', mime='image/png'))
+
+    def test_invalid_base64(self):
+        self.assert_invalid('data:image/png;base64,not base64!')
+
+    def test_missing_base64_marker(self):
+        self.assert_invalid('data:image/png,iVBORw0KGgo=')
+
+    def test_non_image_payload(self):
+        for payload in (b'<svg xmlns="http://www.w3.org/2000/svg"/>',
+                        b'\x89PNG\r\n\x1a\n' + b'\x00' * 32):
+            with self.subTest(payload=payload[:8]):
+                encoded = base64.b64encode(payload).decode()
+                self.assert_invalid(f'data:image/png;base64,{encoded}')
+
+
+class RefreshRecipeImagesTests(APITestCase):
+
+    def save_image(self, name):
+        buffer = io.BytesIO()
+        Image.new('RGB', (1000, 500), 'blue').save(buffer, 'PNG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def refresh(self, **options):
+        call_command('refresh_recipe_images', stdout=io.StringIO(), **options)
+
+    def test_builds_missing_and_stale_renditions(self):
+        missing = self.create_recipe(
+            image=self.save_image('recipes/images/missing.png')
+        )
+        stale = self.create_recipe(
+            image=self.save_image('recipes/images/stale.png')
+        )
+        Recipe.objects.filter(pk=stale.pk).update(
+            image_renditions={'source': 'recipes/images/old.png'}
+        )
+        self.refresh(workers=1)
+        for recipe in (missing, stale):
+            recipe.refresh_from_db()
+            renditions = recipe.image_renditions
+            self.assertEqual(renditions['source'], recipe.image.name)
+            self.assertTrue(default_storage.exists(renditions['thumbnail']))
+            with default_storage.open(renditions['thumbnail']) as file:
+                self.assertEqual(Image.open(file).size, (320, 160))
+
+    def test_skips_processed_recipes(self):
+        recipe = self.create_recipe(
+            image=self.save_image('recipes/images/done.png')
+        )
+        self.refresh()
+        renditions = Recipe.objects.get(pk=recipe.pk).image_renditions
+        self.refresh()
+        self.assertEqual(
+            Recipe.objects.get(pk=recipe.pk).image_renditions, renditions
+        )
+
+    def test_reports_failed_recipes(self):
+        self.create_recipe(image='recipes/images/absent.png')
+        output = io.StringIO()
+        with self.assertLogs('recipes.images', 'ERROR'):
+            call_command('refresh_recipe_images', stdout=output)
+        self.assertIn('не удалось обработать 1', output.getvalue())
@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase, override_settings
+
+from api.metrics import is_allowed_address
+
+
+class MetricsAccessTests(SimpleTestCase):
+
+    def test_is_allowed_address(self):
+        allowed = ['127.0.0.1', '172.16.0.0/12']
+        self.assertTrue(is_allowed_address('127.0.0.1', allowed))
+        self.assertTrue(is_allowed_address('172.18.0.5', allowed))
+        self.assertFalse(is_allowed_address('10.0.0.1', allowed))
+        self.assertFalse(is_allowed_address('', allowed))
+
+    @override_settings(METRICS_ENABLED=True,
+                       METRICS_ALLOWED_IPS=['172.16.0.0/12'])
+    def test_metrics_view(self):
+        response = self.client.get('/api/metrics/', REMOTE_ADDR='172.18.0.5')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get('/api/metrics/', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_ENABLED=False)
+    def test_metrics_disabled(self):
+        response = self.client.get('/api/metrics/', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, 404)
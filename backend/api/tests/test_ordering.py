@@ -0,0 +1,46 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import APITestCase
+from recipes.models import Favorite, RecipeScore
+
+
+class RecipeOrderingTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipes = [
+            self.create_recipe(tags=self.tags[:1], name=f'рецепт {index}')
+            for index in range(3)
+        ]
+
+    def test_recipe_gets_score_row(self):
+        self.assertEqual(
+            set(RecipeScore.objects.values_list('recipe_id', flat=True)),
+            {recipe.pk for recipe in self.recipes}
+        )
+
+    def test_popular_orders_by_score_then_recipe(self):
+        RecipeScore.objects.filter(recipe=self.recipes[0]).update(popular=5)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.anon_client.get('/api/recipes/?ordering=popular')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['results']],
+            [self.recipes[0].pk, self.recipes[2].pk, self.recipes[1].pk]
+        )
+        sql = next(
+            query['sql'] for query in queries.captured_queries
+            if 'ORDER BY "recipes_recipescore"' in query['sql']
+        )
+        self.assertIn('INNER JOIN "recipes_recipescore"', sql)
+        self.assertNotIn('NULLS LAST', sql)
+
+    def test_trending_lists_new_recipe(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipes[1])
+        recipe = self.create_recipe(tags=self.tags[:1], name='новый')
+        response = self.anon_client.get('/api/recipes/?ordering=trending')
+        self.assertIn(
+            recipe.pk,
+            [recipe['id'] for recipe in response.json()['results']]
+        )
@@ -0,0 +1,56 @@
+from urllib.parse import urlsplit
+
+from django.utils import timezone
+
+from api.tests.base import APITestCase
+from recipes.models import Recipe
+
+
+class RecipePaginationTests(APITestCase):
+    """Постраничный вывод рецептов по номеру страницы и по курсору."""
+
+    def setUp(self):
+        super().setUp()
+        self.recipes = [
+            self.create_recipe(name=f'рецепт {index}') for index in range(7)
+        ]
+        # Одинаковая дата публикации у всех рецептов: порядок курсора
+        # держится на id
+        Recipe.objects.update(created=timezone.now())
+
+    def get(self, url):
+        response = self.anon_client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_cursor_walks_all_recipes_without_duplicates(self):
+        data = self.get('/api/recipes/?pagination=cursor&limit=3')
+        self.assertEqual(set(data), {'next', 'previous', 'results'})
+        ids = []
+        while True:
+            ids.extend(recipe['id'] for recipe in data['results'])
+            if data['next'] is None:
+                break
+            url = urlsplit(data['next'])
+            self.assertIn('cursor=', url.query)
+            data = self.get(f'{url.path}?{url.query}')
+        self.assertEqual(
+            ids, sorted((recipe.pk for recipe in self.recipes), reverse=True)
+        )
+
+    def test_page_numbers_keep_response_shape(self):
+        data = self.get('/api/recipes/?page=2&limit=3')
+        self.assertEqual(
+            set(data), {'count', 'next', 'previous', 'results'}
+        )
+        self.assertEqual(data['count'], len(self.recipes))
+        self.assertEqual(len(data['results']), 3)
+
+    def test_ordering_and_search_use_page_numbers(self):
+        for query in ('ordering=popular', 'search=рецепт'):
+            with self.subTest(query=query):
+                data = self.get(
+                    f'/api/recipes/?pagination=cursor&limit=3&{query}'
+                )
+                self.assertEqual(data['count'], len(self.recipes))
+                self.assertIn('page=2', data['next'])
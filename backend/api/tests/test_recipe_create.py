@@ -0,0 +1,95 @@
+import base64
+import io
+
+from PIL import Image
+
+from api.tests.base import APITestCase
+from recipes.models import Ingredient
+
+
+def encode_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'green').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+class RecipeCreateTests(APITestCase):
+    """Создание рецепта и ошибки по позициям ингредиентов и тэгов."""
+    # Ингредиенты и тэги для проверки, INSERT рецепта, UPDATE счетчика
+    # автора, INSERT оценки, тэги рецепта (чтение и INSERT), INSERT
+    # ингредиентов, вектор ингредиентов (чтение и UPDATE), затем рецепт
+    # с автором и флагами, тэги и ингредиенты для ответа
+    CREATE_QUERIES = 13
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.ingredients += [
+            Ingredient.objects.create(
+                name=f'ингредиент {index}', measurement_unit='г'
+            )
+            for index in range(len(cls.ingredients), 30)
+        ]
+
+    def payload(self, ingredients, tags):
+        return {
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in ingredients
+            ],
+            'tags': tags,
+            'image': encode_image(),
+            'name': 'рецепт',
+            'text': 'описание',
+            'cooking_time': 10,
+        }
+
+    def post(self, ingredients, tags):
+        return self.user_client.post(
+            '/api/recipes/', self.payload(ingredients, tags), format='json'
+        )
+
+    def test_query_count_does_not_depend_on_ingredients(self):
+        tags = [tag.pk for tag in self.tags]
+        for count in (2, 30):
+            with self.subTest(count=count):
+                with self.assertNumQueries(self.CREATE_QUERIES):
+                    response = self.post(
+                        [ingredient.pk for ingredient in
+                         self.ingredients[:count]],
+                        tags
+                    )
+                self.assertEqual(response.status_code, 201, response.content)
+                self.assertEqual(len(response.json()['ingredients']), count)
+
+    def test_ingredient_errors_are_aligned_with_input(self):
+        first, second = self.ingredients[:2]
+        with self.assertNumQueries(2):
+            response = self.post(
+                [first.pk, 0, second.pk, first.pk], [self.tags[0].pk]
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'ingredients': [
+            {},
+            {'id': ['Такого ингредиента не существует']},
+            {},
+            {'id': ['Этот ингредиент уже добавлен']},
+        ]})
+
+    def test_tag_errors_are_keyed_by_position(self):
+        first, second = self.tags[:2]
+        response = self.post(
+            [self.ingredients[0].pk], [first.pk, 0, second.pk, first.pk]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'tags': {
+            '1': ['Такого тега не существует'],
+            '3': ['Тег уже выбран'],
+        }})
+
+    def test_empty_lists(self):
+        response = self.post([], [])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'ingredients', 'tags'})
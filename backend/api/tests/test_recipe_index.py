@@ -0,0 +1,47 @@
+from api.recipe_index import RecipeIngredientIndex
+from api.tests.base import APITestCase
+
+
+class RecipeIngredientIndexTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.index = RecipeIngredientIndex()
+        self.recipe = self.create_recipe(ingredients=self.ingredients[:2])
+
+    def match(self, ingredients):
+        return [
+            (recipe_id, matched, missing)
+            for recipe_id, matched, missing in self.index.match(
+                [ingredient.pk for ingredient in ingredients]
+            )[0:10]
+        ]
+
+    def test_match(self):
+        self.assertEqual(
+            self.match(self.ingredients[:1]), [(self.recipe.pk, 1, 1)]
+        )
+
+    def test_reload_keeps_changes_made_while_building(self):
+        build = self.index._build
+        new_ingredient = self.ingredients[4]
+
+        def build_with_concurrent_update():
+            # Построение идет без блокировки: запросы и обновления
+            # не ждут его окончания
+            self.assertTrue(self.index._lock.acquire(blocking=False))
+            self.index._lock.release()
+            state = build()
+            self.index.update_recipe(self.recipe.pk, [new_ingredient.pk])
+            return state
+
+        self.index._build = build_with_concurrent_update
+        self.assertEqual(
+            self.match([new_ingredient]), [(self.recipe.pk, 1, 0)]
+        )
+        self.assertEqual(self.match(self.ingredients[:1]), [])
+
+    def test_remove_recipe(self):
+        self.match(self.ingredients[:1])
+        self.index.remove_recipe(self.recipe.pk)
+        self.assertEqual(self.match(self.ingredients[:2]), [])
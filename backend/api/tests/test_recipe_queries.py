@@ -0,0 +1,55 @@
+from django.core.cache import cache
+
+from api.tests.base import APITestCase
+from recipes.models import Favorite, ShoppingCart
+
+
+class RecipeQueryCountTests(APITestCase):
+    """Число запросов не зависит от размера страницы."""
+    # COUNT, рецепты с авторами и флагами, тэги, ингредиенты
+    LIST_QUERIES = 4
+    # Рецепт с автором и флагами, тэги, ингредиенты
+    DETAIL_QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        authors = (cls.author, cls.create_user('second_author'))
+        cls.recipes = [
+            cls.create_recipe(
+                author=authors[index % 2], tags=cls.tags[:2],
+                ingredients=cls.ingredients[:3], name=f'рецепт {index}'
+            )
+            for index in range(6)
+        ]
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def assert_list_queries(self, client, limit):
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = client.get(f'/api/recipes/?limit={limit}&page=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), limit)
+
+    def test_list_anonymous(self):
+        for limit in (1, len(self.recipes)):
+            with self.subTest(limit=limit):
+                self.assert_list_queries(self.anon_client, limit)
+
+    def test_list_authenticated(self):
+        for limit in (1, len(self.recipes)):
+            with self.subTest(limit=limit):
+                self.assert_list_queries(self.user_client, limit)
+
+    def test_detail(self):
+        for client in (self.anon_client, self.user_client):
+            with self.subTest(client=client):
+                with self.assertNumQueries(self.DETAIL_QUERIES):
+                    response = client.get(
+                        f'/api/recipes/{self.recipes[0].pk}/'
+                    )
+                self.assertEqual(response.status_code, 200)
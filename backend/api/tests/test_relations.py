@@ -0,0 +1,113 @@
+import threading
+from unittest import mock
+
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.tests.base import MEDIA_ROOT, APITestCase
+from api.views import FAVORITE
+from recipes.models import Favorite, Recipe
+
+
+class RelationToggleQueriesTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.recipe = self.create_recipe(tags=self.tags[:1])
+        self.url = f'/api/recipes/{self.recipe.pk}/favorite/'
+
+    def test_add_queries(self):
+        # Рецепт для ответа, INSERT и UPDATE счетчика; SAVEPOINT и
+        # RELEASE вокруг вставки тоже считаются
+        with self.assertNumQueries(5):
+            response = self.user_client.post(self.url)
+        self.assertEqual(response.status_code, 201)
+
+    def test_remove_queries(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        # Сбор удаляемых строк для сигналов, DELETE и UPDATE счетчика
+        with self.assertNumQueries(3):
+            response = self.user_client.delete(self.url)
+        self.assertEqual(response.status_code, 204)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING_WORKERS=0)
+class RelationToggleConcurrencyTests(TransactionTestCase):
+    THREADS = 8
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite в памяти не поддерживает параллельную '
+                          'запись, задайте DB_TEST_NAME')
+        self.user = APITestCase.create_user('cook')
+        self.recipe = APITestCase.create_recipe(
+            author=APITestCase.create_user('author'), image=''
+        )
+
+    def post_concurrently(self, url):
+        barrier = threading.Barrier(self.THREADS)
+        statuses = []
+
+        def post():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                statuses.append(client.post(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=post) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(statuses)
+
+    def test_concurrent_adds_create_one_relation(self):
+        statuses = self.post_concurrently(
+            f'/api/recipes/{self.recipe.pk}/favorite/'
+        )
+        self.assertEqual(statuses, [201] + [400] * (self.THREADS - 1))
+        self.assertEqual(Favorite.objects.count(), 1)
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).favorites_count, 1
+        )
+
+
+class RelationToggleBatchTests(APITestCase):
+
+    def test_add_many_counts_rows_inserted_concurrently(self):
+        recipes = [self.create_recipe(tags=self.tags[:1]) for _ in range(2)]
+        Favorite.objects.create(user=self.user, recipe=recipes[0])
+        # Строка вставлена параллельным запросом после проверки
+        # существующих связей
+        with mock.patch.object(FAVORITE, 'get_existing', return_value=set()):
+            FAVORITE.add_many(self.user, [recipe.pk for recipe in recipes])
+        self.assertEqual(
+            [Recipe.objects.get(pk=recipe.pk).favorites_count
+             for recipe in recipes],
+            [1, 1]
+        )
+
+    def test_remove_many_queries(self):
+        recipes = [self.create_recipe(tags=self.tags[:1]) for _ in range(5)]
+        for recipe in recipes:
+            Favorite.objects.create(user=self.user, recipe=recipe)
+        Favorite.objects.create(user=self.author, recipe=recipes[0])
+        # Существующие связи, DELETE и UPDATE счетчиков; SAVEPOINT и
+        # RELEASE вокруг транзакции тоже считаются
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(5):
+                removed = FAVORITE.remove_many(
+                    self.user, [recipe.pk for recipe in recipes]
+                )
+        self.assertEqual(removed, {recipe.pk for recipe in recipes})
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(Favorite.objects.filter(user=self.user).exists())
+        self.assertEqual(
+            [Recipe.objects.get(pk=recipe.pk).favorites_count
+             for recipe in recipes],
+            [1, 0, 0, 0, 0]
+        )
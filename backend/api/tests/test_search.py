@@ -0,0 +1,58 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import APITestCase
+from recipes.models import RecipeScore
+
+
+class RecipeSearchTests(APITestCase):
+    """Поиск ?search= через FTS5 в SQLite и tsvector в PostgreSQL."""
+
+    def setUp(self):
+        super().setUp()
+        self.in_text = self.create_recipe(
+            name='Суп дня', text='Наваристый борщ на говяжьем бульоне'
+        )
+        self.in_name = self.create_recipe(
+            name='Борщ украинский', text='Со свеклой и капустой'
+        )
+        self.other = self.create_recipe(
+            name='Омлет', text='Яйца и молоко'
+        )
+
+    def search(self, query):
+        response = self.anon_client.get(f'/api/recipes/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_matches_name_and_text(self):
+        self.assertEqual(
+            set(self.search('search=борщ')),
+            {self.in_text.pk, self.in_name.pk}
+        )
+        self.assertEqual(self.search('search=капустой'), [self.in_name.pk])
+
+    def test_name_match_ranks_above_text_match(self):
+        self.assertEqual(
+            self.search('search=борщ'), [self.in_name.pk, self.in_text.pk]
+        )
+
+    def test_ordering_overrides_relevance(self):
+        RecipeScore.objects.filter(recipe=self.in_text).update(popular=5)
+        self.assertEqual(
+            self.search('search=борщ&ordering=popular'),
+            [self.in_text.pk, self.in_name.pk]
+        )
+
+    def test_query_without_words_does_not_filter(self):
+        everything = self.search('')
+        for query in ('search=', 'search=%20', 'search=!!!', 'search=%22*'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), everything)
+
+    def test_list_does_not_load_vectors(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search('search=борщ')
+        for query in queries.captured_queries:
+            self.assertNotIn('"search_vector"', query['sql'].split('FROM')[0])
+            self.assertNotIn('"ingredient_vector"', query['sql'])
@@ -0,0 +1,113 @@
+import csv
+import io
+import json
+
+from api.management.commands.benchmark import ClientRunner
+from api.tests.base import APITestCase
+from recipes.models import Ingredient, ShoppingCart
+from rest_framework.authtoken.models import Token
+
+
+class DownloadShoppingCartTests(APITestCase):
+    # Векторы ингредиентов рецептов в корзине и сами ингредиенты
+    QUERIES = 2
+
+    def fill_cart(self, count):
+        for index in range(count):
+            recipe = self.create_recipe(
+                tags=self.tags[:1], ingredients=self.ingredients[:2],
+                name=f'рецепт {index}'
+            )
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def download(self):
+        response = self.user_client.get(
+            '/api/recipes/download_shopping_cart/?format=json'
+        )
+        self.assertEqual(response.status_code, 200)
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_query_count_does_not_grow_with_cart(self):
+        # Корзина из одного рецепта, затем из шести
+        for count in (1, 5):
+            self.fill_cart(count)
+            with self.assertNumQueries(self.QUERIES):
+                rows = self.download()
+            self.assertEqual(len(rows), 2)
+
+    def test_amounts_are_summed(self):
+        self.fill_cart(3)
+        rows = self.download()
+        self.assertEqual(
+            {row['name']: row['amount'] for row in rows},
+            {ingredient.name: 30 for ingredient in self.ingredients[:2]}
+        )
+
+    def test_multiple_units_are_merged(self):
+        ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (
+                ('сахар', 'г'), ('сахар', 'кг'), ('молоко', 'мл'),
+                ('молоко', 'л'), ('сахар', 'ст. л.'),
+            )
+        ]
+        for recipe_ingredients in (ingredients[::2], ingredients[1::2]):
+            recipe = self.create_recipe(ingredients=recipe_ingredients)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+        self.assertEqual(self.download(), [
+            {'name': 'молоко', 'measurement_unit': 'мл', 'amount': 10010},
+            {'name': 'сахар', 'measurement_unit': 'г', 'amount': 10010},
+            {'name': 'сахар', 'measurement_unit': 'ст. л.', 'amount': 10},
+        ])
+
+
+class ExportFormatTests(APITestCase):
+    """Форматы выгрузки списка покупок."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        recipe = cls.create_recipe(ingredients=cls.ingredients[:2])
+        ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    def download(self, export_format):
+        return self.user_client.get(
+            f'/api/recipes/download_shopping_cart/?format={export_format}'
+        )
+
+    def test_csv(self):
+        response = self.download('csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('shopping_cart.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(list(csv.reader(io.StringIO(content))), [
+            ['name', 'measurement_unit', 'amount'],
+            *([ingredient.name, 'г', '10']
+              for ingredient in self.ingredients[:2]),
+        ])
+
+    def test_pdf(self):
+        response = self.download('pdf')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertIn('shopping_cart.pdf', response['Content-Disposition'])
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF-'))
+        self.assertIn(b'%%EOF', content[-32:])
+
+    def test_unknown_format(self):
+        response = self.download('xlsx')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('errors', response.json())
+
+    def test_benchmark_measures_time_to_first_byte(self):
+        token, _ = Token.objects.get_or_create(user=self.user)
+        runner = ClientRunner(token.key)
+        status_code, duration, first_byte, queries = runner.request(
+            '/api/recipes/download_shopping_cart/?format=pdf'
+        )
+        self.assertEqual(status_code, 200)
+        self.assertLessEqual(first_byte, duration)
+        self.assertGreater(queries, 0)
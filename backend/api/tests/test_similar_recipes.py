@@ -0,0 +1,86 @@
+from django.core.management import call_command
+from django.utils import timezone
+
+from api.tests.base import APITestCase
+from recipes.models import IngredientsAmount, Recipe, RecipeSimilarity
+
+
+class RefreshSimilarRecipesTests(APITestCase):
+
+    def refresh(self, **options):
+        call_command('refresh_similar_recipes', stdout=None, **options)
+
+    def similar(self, recipe):
+        return set(RecipeSimilarity.objects.filter(
+            recipe=recipe
+        ).values_list('similar_id', flat=True))
+
+    def scores(self, recipe):
+        return dict(RecipeSimilarity.objects.filter(
+            recipe=recipe
+        ).values_list('similar_id', 'score'))
+
+    def test_shared_tag_raises_score(self):
+        ingredients = self.ingredients[:1]
+        first = self.create_recipe(tags=self.tags[:1], ingredients=ingredients)
+        same_tag = self.create_recipe(
+            tags=self.tags[:1], ingredients=ingredients
+        )
+        other_tag = self.create_recipe(
+            tags=self.tags[1:2], ingredients=ingredients
+        )
+        self.refresh(full=True, max_df=1.0)
+        scores = self.scores(first)
+        self.assertGreater(scores[same_tag.pk], scores[other_tag.pk])
+
+    def test_shared_tag_alone_is_not_a_candidate(self):
+        first = self.create_recipe(
+            tags=self.tags[:1], ingredients=self.ingredients[:1]
+        )
+        self.create_recipe(
+            tags=self.tags[:1], ingredients=self.ingredients[1:2]
+        )
+        self.refresh(full=True, max_df=1.0)
+        self.assertEqual(self.similar(first), set())
+
+    def test_frequent_ingredient_only_scores_candidates(self):
+        common, rare = self.ingredients[:2]
+        first = self.create_recipe(ingredients=(common, rare))
+        second = self.create_recipe(ingredients=(common, rare))
+        self.create_recipe(ingredients=(common,))
+        self.refresh(full=True, max_df=1.0)
+        exact = self.scores(first)
+        self.refresh(full=True, max_df=1.0, max_postings=2)
+        self.assertEqual(self.scores(first), {second.pk: exact[second.pk]})
+
+    def test_incremental_keeps_top_candidates(self):
+        recipes = [
+            self.create_recipe(ingredients=self.ingredients[:1])
+            for _ in range(4)
+        ]
+        self.refresh(full=True, max_df=1.0, top=2)
+        for recipe in recipes:
+            self.assertEqual(len(self.similar(recipe)), 2)
+        Recipe.objects.filter(pk=recipes[0].pk).update(
+            updated=timezone.now()
+        )
+        self.refresh(max_df=1.0, top=2)
+        for recipe in recipes:
+            self.assertEqual(len(self.similar(recipe)), 2)
+
+    def test_incremental_drops_recipe_without_shared_features(self):
+        changed = self.create_recipe(
+            tags=self.tags[:1], ingredients=self.ingredients[:1]
+        )
+        neighbour = self.create_recipe(
+            tags=self.tags[1:2], ingredients=self.ingredients[:1]
+        )
+        self.refresh(full=True, max_df=1.0)
+        self.assertEqual(self.similar(neighbour), {changed.pk})
+        IngredientsAmount.objects.filter(recipe=changed).update(
+            ingredient=self.ingredients[1]
+        )
+        Recipe.objects.filter(pk=changed.pk).update(updated=timezone.now())
+        self.refresh(max_df=1.0)
+        self.assertEqual(self.similar(neighbour), set())
+        self.assertEqual(self.similar(changed), set())
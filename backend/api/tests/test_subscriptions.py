@@ -0,0 +1,80 @@
+from django.core.cache import cache
+
+from api.tests.base import APITestCase
+from users.models import Subscription
+
+
+class SubscriptionsTests(APITestCase):
+    """Подписки выводятся с последними рецептами авторов."""
+    # COUNT, авторы страницы, последние рецепты всех авторов страницы
+    QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.authors = [cls.author] + [
+            cls.create_user(f'author_{index}') for index in range(3)
+        ]
+        cls.recipes = {
+            author.pk: [
+                cls.create_recipe(author=author, name=f'рецепт {index}')
+                for index in range(count)
+            ]
+            for author, count in zip(cls.authors, (5, 1, 0, 4))
+        }
+        for author in cls.authors:
+            Subscription.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get_subscriptions(self, query):
+        with self.assertNumQueries(self.QUERIES):
+            response = self.user_client.get(
+                f'/api/users/subscriptions/?{query}'
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_query_count_does_not_depend_on_page_size(self):
+        for limit in (1, len(self.authors)):
+            with self.subTest(limit=limit):
+                data = self.get_subscriptions(f'limit={limit}&page=1')
+                self.assertEqual(len(data['results']), limit)
+
+    def test_latest_recipes_per_author(self):
+        data = self.get_subscriptions('limit=10&recipes_limit=3')
+        for author in data['results']:
+            expected = [
+                recipe.pk for recipe in reversed(self.recipes[author['id']])
+            ][:3]
+            self.assertEqual(
+                [recipe['id'] for recipe in author['recipes']], expected
+            )
+            for recipe in author['recipes']:
+                self.assertEqual(
+                    set(recipe), {'id', 'name', 'image', 'cooking_time'}
+                )
+
+    def test_cursor_parameters_keep_page_numbers(self):
+        for query in ('pagination=cursor', 'cursor=abc'):
+            with self.subTest(query=query):
+                response = self.user_client.get(
+                    f'/api/users/subscriptions/?{query}'
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['count'], len(self.authors))
+
+    def test_subscribe_returns_latest_recipes(self):
+        Subscription.objects.filter(
+            user=self.user, author=self.author
+        ).delete()
+        response = self.user_client.post(
+            f'/api/users/{self.author.pk}/subscribe/?recipes_limit=2'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.json()['recipes']],
+            [recipe.pk for recipe in self.recipes[self.author.pk][:-3:-1]],
+        )
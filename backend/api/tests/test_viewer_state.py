@@ -0,0 +1,38 @@
+from django.core.cache import cache
+
+from api.tests.base import APITestCase
+from api.viewer_state import ViewerState, get_state_cache_key
+from recipes.models import Favorite
+
+
+class ViewerStateInvalidationTests(APITestCase):
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.recipe = self.create_recipe(tags=self.tags[:1])
+        self.key = get_state_cache_key(self.user.pk, 'favorites')
+
+    def load_state(self):
+        self.assertFalse(ViewerState(self.user).is_favorited(self.recipe.pk))
+        self.assertIsNotNone(cache.get(self.key))
+
+    def test_signal_invalidates_after_commit(self):
+        self.load_state()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Favorite.objects.create(user=self.user, recipe=self.recipe)
+            self.assertIsNotNone(cache.get(self.key))
+        for callback in callbacks:
+            callback()
+        self.assertIsNone(cache.get(self.key))
+
+    def test_batch_add_invalidates_after_commit(self):
+        self.load_state()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.user_client.post(
+                '/api/recipes/favorite/batch/',
+                {'recipes': [self.recipe.pk]}, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertIsNone(cache.get(self.key))
+        self.assertTrue(ViewerState(self.user).is_favorited(self.recipe.pk))
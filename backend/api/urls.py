@@ -1,9 +1,23 @@
 from api import views
-from django.urls import include, path
+from api.async_views import async_read_view
+from django.conf import settings
+from django.urls import URLPattern, include, path
 from rest_framework.routers import SimpleRouter
 
 app_name = 'api'
 
+ASYNC_READ_ROUTES = (
+    'recipes-list',
+    'recipes-detail',
+    'recipes-download-shopping-cart',
+    'recipes-from-ingredients',
+    'recipes-similar',
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+)
+
 router_v1 = SimpleRouter()
 router_v1.register('recipes', views.RecipeViewSet, basename='recipes')
 router_v1.register('tags', views.TagViewSet, basename='tags')
@@ -13,7 +27,18 @@ router_v1.register(
     basename='ingredients'
 )
 
+router_urls = router_v1.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = [
+        URLPattern(
+            pattern.pattern, async_read_view(pattern.callback),
+            pattern.default_args, pattern.name
+        ) if pattern.name in ASYNC_READ_ROUTES else pattern
+        for pattern in router_urls
+    ]
+
 urlpatterns = [
-    path('', include(router_v1.urls)),
+    path('metrics/', views.metrics, name='metrics'),
+    path('', include(router_urls)),
     path('', include('users.urls')),
 ]
@@ -0,0 +1,110 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+STATE_SOURCES = {
+    'favorites': (Favorite, 'user', 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'user', 'recipe_id'),
+    'subscriptions': (Subscription, 'user', 'author_id'),
+}
+
+
+class IdSet:
+    """Отсортированный массив идентификаторов с поиском делением пополам.
+
+    Занимает 8 байт на идентификатор, поэтому подходит для пользователей
+    с тысячами рецептов в избранном.
+    """
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    @classmethod
+    def from_ids(cls, ids):
+        return cls(array('q', sorted(ids)))
+
+    @classmethod
+    def from_bytes(cls, data):
+        ids = array('q')
+        ids.frombytes(data)
+        return cls(ids)
+
+    def to_bytes(self):
+        return self.ids.tobytes()
+
+    def __contains__(self, value):
+        index = bisect_left(self.ids, value)
+        return index < len(self.ids) and self.ids[index] == value
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def get_state_cache_key(user_id, name):
+    return f'viewer:{user_id}:{name}'
+
+
+def invalidate_viewer_state(user_id, name):
+    """Сбрасывает кеш после фиксации транзакции.
+
+    Иначе параллельный запрос успеет прочитать старые данные до фиксации
+    и снова положить их в кеш.
+    """
+    key = get_state_cache_key(user_id, name)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+class ViewerState:
+    """Избранное, список покупок и подписки текущего пользователя.
+
+    Каждое множество загружается одним запросом при первом обращении
+    и хранится в кеше VIEWER_STATE_CACHE_TIMEOUT секунд. Сигналы моделей
+    сбрасывают кеш после фиксации добавления или удаления записей.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self._sets = {}
+
+    def get_set(self, name):
+        if name in self._sets:
+            return self._sets[name]
+        if not self.user.is_authenticated:
+            id_set = IdSet.from_ids(())
+        else:
+            key = get_state_cache_key(self.user.pk, name)
+            data = cache.get(key)
+            if data is None:
+                model, user_field, id_field = STATE_SOURCES[name]
+                id_set = IdSet.from_ids(model.objects.filter(
+                    **{user_field: self.user}
+                ).values_list(id_field, flat=True))
+                cache.set(key, id_set.to_bytes(),
+                          settings.VIEWER_STATE_CACHE_TIMEOUT)
+            else:
+                id_set = IdSet.from_bytes(data)
+        self._sets[name] = id_set
+        return id_set
+
+    def is_favorited(self, recipe_id):
+        return recipe_id in self.get_set('favorites')
+
+    def is_in_shopping_cart(self, recipe_id):
+        return recipe_id in self.get_set('shopping_cart')
+
+    def is_subscribed(self, author_id):
+        return author_id in self.get_set('subscriptions')
+
+
+def get_viewer_state(request):
+    """Состояние текущего пользователя, общее для всех сериализаторов."""
+    state = getattr(request, '_viewer_state', None)
+    if state is None or state.user != request.user:
+        state = ViewerState(request.user)
+        request._viewer_state = state
+    return state
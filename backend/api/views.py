@@ -1,30 +1,60 @@
-from api.filters import IngredientSearchFilterSet, RecipeFilterSet
-from api.serializers import (IngredientSerializer, RecipeSerializer,
-                             RecipeCreateSerializer, TagSerializer)
-from api.pagination import ForPageNumberPagination
-from django.http import HttpResponse
+from api.caching import CachedResponseMixin
+from api.exporters import EXPORTERS
+from api.filters import RecipeFilterSet
+from api.ingredient_index import ingredient_index
+from api.metrics import is_allowed_address, metrics_registry
+from api.negotiation import ExportContentNegotiation
+from api.serializers import (IngredientSerializer, RecipeCreateSerializer,
+                             RecipeIdsSerializer, RecipeSerializer,
+                             TagSerializer)
+from api.pagination import RankedPageNumberPagination, RecipePagination
+from api.recipe_index import recipe_ingredient_index
+from api.services import RelationToggle, get_shopping_list
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeSimilarity,
+                            ShoppingCart, Tag)
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from users.serializers import RecipePartInfoSerializer
 
+FAVORITE = RelationToggle(Favorite, 'recipe', 'favorites_count', 'favorites')
+SHOPPING_CART = RelationToggle(
+    ShoppingCart, 'recipe', 'shopping_cart_count', 'shopping_cart'
+)
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+
+class IngredientViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """Класс работы с ингредиентами."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
-    filterset_class = IngredientSearchFilterSet
+    cache_namespace = 'ingredients'
+
+    def list(self, request):
+        """Поиск ингредиентов по индексу в памяти без запросов к БД.
 
+        Ответы на поиск по имени не кешируются: индекс отвечает быстрее
+        кеша, а вариантов запроса слишком много.
+        """
+        name = request.query_params.get('name', '')
+        limit = request.query_params.get('limit', '')
+        limit = int(limit) if limit.isdigit() else None
+        return self.get_cached_response(
+            request, lambda: Response(ingredient_index.search(name, limit)),
+            store=not name
+        )
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
     """Класс работы с тэгами."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    cache_namespace = 'tags'
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
@@ -32,10 +62,29 @@ class RecipeViewSet(viewsets.ModelViewSet):
     RESPONSE_DETAIL = {
         'detail': 'У вас недостаточно прав для выполнения данного действия.'
     }
+    ORDERINGS = {
+        'popular': ('-score__popular', '-id'),
+        'trending': ('-score__trending', '-id'),
+    }
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     filterset_class = RecipeFilterSet
-    pagination_class = ForPageNumberPagination
+    pagination_class = RecipePagination
+
+    def get_queryset(self):
+        queryset = Recipe.objects.with_related().with_user_flags(
+            self.request.user
+        )
+        ordering = self.ORDERINGS.get(
+            self.request.query_params.get('ordering')
+        )
+        if ordering is not None:
+            # Внутреннее соединение с оценками позволяет читать рецепты
+            # в порядке индекса по (оценка, рецепт).
+            queryset = queryset.filter(score__isnull=False).order_by(
+                *ordering
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method == 'GET':
@@ -61,6 +110,21 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(self.RESPONSE_DETAIL, status=status.HTTP_403_FORBIDDEN)
 
+    def toggle_relation(self, request, pk, relation, response_errors):
+        """Добавление или удаление рецепта в избранное или корзину."""
+        if request.method == 'POST':
+            recipe = get_object_or_404(Recipe, pk=pk)
+            if relation.add(request.user, recipe):
+                serializer = RecipePartInfoSerializer(recipe)
+                return Response(serializer.data,
+                                status=status.HTTP_201_CREATED)
+        if request.method == 'DELETE':
+            if relation.remove(request.user, pk):
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            get_object_or_404(Recipe, pk=pk)
+        response = {'errors': response_errors[request.method]}
+        return Response(response, status=status.HTTP_400_BAD_REQUEST)
+
     @action(methods=['post', 'delete'], detail=False,
             url_path='(?P<pk>[^/.]+)/favorite',
             permission_classes=[IsAuthenticated])
@@ -69,20 +133,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
             'POST': 'Вы уже добавили этот рецепт в избранное',
             'DELETE': 'Вы еще не добавили этот рецепт в избранное',
         }
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
-        favorite = Favorite.objects.filter(recipe=recipe, user=user)
-        is_favorite = bool(favorite)
-        if request.method == 'POST' and not is_favorite:
-            favorite = Favorite(recipe=recipe, user=user)
-            favorite.save()
-            serializer = RecipePartInfoSerializer(recipe)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if request.method == 'DELETE' and is_favorite:
-            favorite.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        response = {'errors': response_errors[request.method]}
-        return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        return self.toggle_relation(request, pk, FAVORITE, response_errors)
 
     @action(methods=['post', 'delete'], detail=False,
             url_path='(?P<pk>[^/.]+)/shopping_cart',
@@ -92,41 +143,136 @@ class RecipeViewSet(viewsets.ModelViewSet):
             'POST': 'Вы уже добавили этот рецепт в список покупок',
             'DELETE': 'Вы еще не добавили этот рецепт в список покупок',
         }
-        recipe = get_object_or_404(Recipe, pk=pk)
-        user = request.user
-        shopping_cart = ShoppingCart.objects.filter(recipe=recipe, user=user)
-        is_in_shopping_cart = bool(shopping_cart)
-        if request.method == 'POST' and not is_in_shopping_cart:
-            shopping_cart = ShoppingCart(recipe=recipe, user=user)
-            shopping_cart.save()
-            serializer = RecipePartInfoSerializer(recipe)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if request.method == 'DELETE' and is_in_shopping_cart:
-            shopping_cart.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        response = {'errors': response_errors[request.method]}
-        return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        return self.toggle_relation(
+            request, pk, SHOPPING_CART, response_errors
+        )
 
-    @action(detail=False, url_path='download_shopping_cart',
+    def batch_relation(self, request, relation):
+        """Пакетное добавление или удаление рецептов с итогом по каждому."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        found = set(Recipe.objects.filter(
+            pk__in=recipe_ids
+        ).values_list('pk', flat=True))
+        valid_ids = [pk for pk in recipe_ids if pk in found]
+        if request.method == 'POST':
+            done = set(relation.add_many(request.user, valid_ids))
+            done_status, skipped_status = 'added', 'already_added'
+        else:
+            done = relation.remove_many(request.user, valid_ids)
+            done_status, skipped_status = 'removed', 'not_added'
+        results = []
+        for pk in recipe_ids:
+            if pk not in found:
+                result_status = 'not_found'
+            elif pk in done:
+                result_status = done_status
+            else:
+                result_status = skipped_status
+            results.append({'id': pk, 'status': result_status})
+        return Response({'results': results})
+
+    @action(methods=['post', 'delete'], detail=False,
+            url_path='favorite/batch',
+            permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        return self.batch_relation(request, FAVORITE)
+
+    @action(methods=['post', 'delete'], detail=False,
+            url_path='shopping_cart/batch',
             permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        return self.batch_relation(request, SHOPPING_CART)
+
+    @action(detail=False, url_path='(?P<pk>[^/.]+)/similar')
+    def similar(self, request, pk):
+        """Похожие рецепты, рассчитанные командой refresh_similar_recipes."""
+        similarities = RecipeSimilarity.objects.filter(
+            recipe_id=pk
+        ).select_related('similar').order_by('-score')
+        recipes = [similarity.similar for similarity in similarities]
+        if not recipes:
+            get_object_or_404(Recipe, pk=pk)
+        serializer = RecipePartInfoSerializer(recipes, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, url_path='from_ingredients',
+            pagination_class=RankedPageNumberPagination)
+    def from_ingredients(self, request):
+        """Рецепты из имеющихся ингредиентов ?ingredients=1&ingredients=2.
+
+        Рецепты упорядочены по числу недостающих ингредиентов, ?max_missing=
+        отбрасывает рецепты, которым не хватает больше ингредиентов.
+        """
+        try:
+            ingredient_ids = [
+                int(value)
+                for value in request.query_params.getlist('ingredients')
+            ]
+            max_missing = request.query_params.get('max_missing')
+            if max_missing is not None:
+                max_missing = int(max_missing)
+        except ValueError:
+            return Response(
+                {'errors': 'Параметры ingredients и max_missing '
+                           'должны быть целыми числами'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ingredient_ids:
+            return Response({'errors': 'Укажите ингредиенты'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        page = self.paginate_queryset(
+            recipe_ingredient_index.match(ingredient_ids, max_missing)
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        results = []
+        for recipe_id, matched, missing in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            data = RecipeSerializer(
+                recipe, context=self.get_serializer_context()
+            ).data
+            data['matched_ingredients'] = matched
+            data['missing_ingredients'] = missing
+            results.append(data)
+        return self.get_paginated_response(results)
+
+    @action(detail=False, url_path='download_shopping_cart',
+            permission_classes=[IsAuthenticated],
+            content_negotiation_class=ExportContentNegotiation)
     def download_shopping_cart(self, request):
-        response = HttpResponse(content_type='text/plain')
-        response['Content-Disposition'] = ('attachment; '
-                                           'filename="shopping_cart.txt"')
-        shopping_cart_ingredients = {}
-        carts = ShoppingCart.objects.filter(user=request.user)
-        shopping_cart = [cart.recipe.ingredients.all() for cart in carts]
-        for ingredients in shopping_cart:
-            for ingredients_amount in ingredients:
-                name = f'{ingredients_amount.ingredient.name} '
-                name += f'({ingredients_amount.ingredient.measurement_unit})'
-                amount = ingredients_amount.amount
-                if name in shopping_cart_ingredients:
-                    shopping_cart_ingredients[name] += amount
-                else:
-                    shopping_cart_ingredients[name] = amount
-        ingredients = 'Список покупок:\n'
-        for name, amount in shopping_cart_ingredients.items():
-            ingredients += f'{name} - {amount} \n'
-        response.write(ingredients)
+        export_format = request.query_params.get('format', 'txt')
+        exporter_class = EXPORTERS.get(export_format)
+        if exporter_class is None:
+            response = {
+                'errors': 'Доступные форматы: ' + ', '.join(EXPORTERS)
+            }
+            return Response(response, status=status.HTTP_400_BAD_REQUEST)
+        exporter = exporter_class(get_shopping_list(request.user))
+        response = StreamingHttpResponse(
+            exporter, content_type=exporter.content_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{exporter.get_filename()}"'
+        )
         return response
+
+
+def metrics(request):
+    """Метрики в формате Prometheus для адресов из METRICS_ALLOWED_IPS.
+
+    nginx не проксирует этот адрес, поэтому REMOTE_ADDR - настоящий адрес
+    сборщика метрик во внутренней сети, а не адрес nginx.
+    """
+    if not settings.METRICS_ENABLED or not is_allowed_address(
+        request.META.get('REMOTE_ADDR', ''), settings.METRICS_ALLOWED_IPS
+    ):
+        raise Http404
+    return HttpResponse(
+        metrics_registry.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
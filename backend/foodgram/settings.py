@@ -31,6 +31,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -70,7 +71,19 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        # Имя тестовой базы; для SQLite файл вместо базы в памяти нужен
+        # тестам с параллельными запросами
+        'TEST': {'NAME': os.getenv('DB_TEST_NAME')},
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -113,7 +126,7 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     # 'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     # 'PAGE_SIZE': 6,
@@ -147,3 +160,61 @@ CORS_URLS_REGEX = r'^/api/.*$'
 MIN_COOKING_TIME = 1
 MIN_INGREDIENTS_AMOUNT = 1
 RECIPES_LIMIT = 3
+
+# Выгрузка списка покупок
+PDF_FONT_PATH = os.getenv(
+    'PDF_FONT_PATH', '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+# Индекс ингредиентов для автодополнения, секунды до перечитывания
+INGREDIENT_INDEX_TTL = 300
+
+# Обратный индекс ингредиентов для поиска рецептов из имеющихся продуктов,
+# секунды до перечитывания
+RECIPE_INGREDIENT_INDEX_TTL = 600
+
+# Кеширование справочников тэгов и ингредиентов, секунды
+API_CACHE_TIMEOUT = 60 * 60 * 24
+API_CACHE_MAX_AGE = 60
+
+# Сортировка рецептов по популярности
+TRENDING_HALF_LIFE_HOURS = 72
+TRENDING_WINDOW_DAYS = 30
+
+# Количество похожих рецептов, сохраняемых для каждого рецепта
+SIMILAR_RECIPES_COUNT = 10
+
+# Обработка картинок рецептов: число потоков (0 - обработка сразу после
+# сохранения), размеры копий и качество сжатия
+IMAGE_PROCESSING_WORKERS = int(os.getenv('IMAGE_PROCESSING_WORKERS', 2))
+IMAGE_RENDITIONS = {
+    'thumbnail': (320, 320),
+    'medium': (800, 800),
+    'full': (1920, 1920),
+}
+IMAGE_QUALITY = 85
+IMAGE_SPOOL_MAX_SIZE = 1024 * 1024
+
+# Время хранения пользователя в кеше токенов, секунды
+TOKEN_CACHE_TIMEOUT = 300
+
+# Кеш избранного, списка покупок и подписок пользователя, секунды
+VIEWER_STATE_CACHE_TIMEOUT = 60 * 10
+
+# Максимум рецептов в одном пакетном запросе к избранному и корзине
+BATCH_MAX_SIZE = 100
+
+# Замеры SQL-запросов и времени ответа: доля замеряемых запросов, порог
+# медленного запроса в мс, число хранимых отпечатков медленных запросов
+# и адреса или подсети, с которых доступен /api/metrics/ напрямую, в обход
+# nginx
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'False') == 'True'
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.05))
+METRICS_SLOW_QUERY_MS = 100
+METRICS_SLOW_QUERY_LIMIT = 200
+METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1').split(',')
+
+# Асинхронные представления на чтение для запуска под ASGI (uvicorn) и
+# число потоков, в которых выполняются их запросы к БД
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+ASYNC_READ_WORKERS = int(os.getenv('ASYNC_READ_WORKERS', 16))
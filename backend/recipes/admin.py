@@ -2,17 +2,51 @@ from django.contrib import admin
 from recipes.models import Ingredient, IngredientsAmount, Recipe, Tag
 
 
+class IngredientsAmountInline(admin.TabularInline):
+    """Ингредиенты рецепта."""
+    model = IngredientsAmount
+    min_num = 1
+    extra = 0
+
+
 class RecipeAdmin(admin.ModelAdmin):
     """Класс рецептов."""
+    inlines = (IngredientsAmountInline,)
     list_display = ('name', 'author', 'get_favorites_count')
+    list_select_related = ('author',)
     list_filter = ('author', 'name', 'tags')
 
     def get_favorites_count(self, obj):
-        return obj.favorite_recipe.count()
+        return obj.favorites_count
 
     get_favorites_count.short_description = (
         'Кол-во человек добавивших в избранное'
     )
+    get_favorites_count.admin_order_field = 'favorites_count'
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.refresh_ingredient_vector()
+
+
+class IngredientsAmountAdmin(admin.ModelAdmin):
+    """Класс количества ингредиентов."""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        obj.recipe.refresh_ingredient_vector()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        obj.recipe.refresh_ingredient_vector()
+
+    def delete_queryset(self, request, queryset):
+        recipes = list(Recipe.objects.filter(
+            pk__in=queryset.values('recipe_id')
+        ))
+        super().delete_queryset(request, queryset)
+        for recipe in recipes:
+            recipe.refresh_ingredient_vector()
 
 
 class IngredientAdmin(admin.ModelAdmin):
@@ -25,4 +59,4 @@ class IngredientAdmin(admin.ModelAdmin):
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Tag)
 admin.site.register(Ingredient, IngredientAdmin)
-admin.site.register(IngredientsAmount)
+admin.site.register(IngredientsAmount, IngredientsAmountAdmin)
@@ -0,0 +1,109 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'recipes/images/renditions/'
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_PROCESSING_WORKERS,
+            thread_name_prefix='recipe-images'
+        )
+    return _executor
+
+
+def render(image, size, image_format):
+    """Уменьшенная копия изображения в заданном формате."""
+    rendition = image.copy()
+    rendition.thumbnail(size, Image.LANCZOS)
+    if image_format == 'JPEG' and rendition.mode not in ('RGB', 'L'):
+        rendition = rendition.convert('RGB')
+    buffer = io.BytesIO()
+    rendition.save(buffer, image_format, quality=settings.IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def create_renditions(source):
+    """Сохраняет варианты изображения и возвращает пути к ним.
+
+    Для каждого размера из IMAGE_RENDITIONS сохраняются JPEG и WebP.
+    """
+    stem = os.path.splitext(os.path.basename(source))[0]
+    with default_storage.open(source) as file:
+        image = ImageOps.exif_transpose(Image.open(file))
+        image.load()
+    renditions = {'source': source}
+    for name, size in settings.IMAGE_RENDITIONS.items():
+        for key, image_format, ext in ((name, 'JPEG', 'jpg'),
+                                       (f'{name}_webp', 'WEBP', 'webp')):
+            renditions[key] = default_storage.save(
+                f'{RENDITIONS_DIR}{stem}_{name}.{ext}',
+                ContentFile(render(image, size, image_format))
+            )
+    return renditions
+
+
+def delete_renditions(renditions):
+    for key, path in renditions.items():
+        if key != 'source':
+            default_storage.delete(path)
+
+
+def process_recipe_image(recipe_id):
+    """Строит варианты изображения рецепта и сохраняет пути в рецепт."""
+    try:
+        recipe = Recipe.objects.filter(pk=recipe_id).only(
+            'image', 'image_renditions'
+        ).first()
+        if recipe is None or not recipe.image:
+            return
+        source = recipe.image.name
+        renditions = create_renditions(source)
+        updated = Recipe.objects.filter(pk=recipe_id, image=source).update(
+            image_renditions=renditions
+        )
+        if updated:
+            delete_renditions(recipe.image_renditions)
+        else:
+            delete_renditions(renditions)
+    except Exception:
+        logger.exception('Не удалось обработать изображение рецепта %s',
+                         recipe_id)
+
+
+def process_recipe_image_in_worker(recipe_id):
+    close_old_connections()
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        close_old_connections()
+
+
+def schedule_recipe_image(recipe_id):
+    """Ставит обработку изображения в очередь после фиксации транзакции.
+
+    При IMAGE_PROCESSING_WORKERS = 0 изображение обрабатывается сразу.
+    """
+    if not settings.IMAGE_PROCESSING_WORKERS:
+        transaction.on_commit(lambda: process_recipe_image(recipe_id))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(
+            process_recipe_image_in_worker, recipe_id
+        )
+    )
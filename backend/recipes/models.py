@@ -1,8 +1,11 @@
 from colorfield.fields import ColorField
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
-from users.models import User
+from django.utils import timezone
+from recipes.units import build_ingredient_vector
+from users.models import CounterFieldsMixin, Subscription, User
 
 
 class Ingredient(models.Model):
@@ -43,29 +46,52 @@ class Tag(models.Model):
         verbose_name_plural = 'Тэги'
 
 
-class IngredientsAmount(models.Model):
-    """Класс количества ингредиентов."""
-    ingredient = models.ForeignKey(
-        Ingredient,
-        on_delete=models.CASCADE,
-        related_name='ingredient',
-        verbose_name='Ингредиент'
-    )
-    amount = models.PositiveSmallIntegerField(
-        verbose_name='Кол-во',
-        validators=(MinValueValidator(settings.MIN_INGREDIENTS_AMOUNT),),
-        unique=False
-    )
+class RecipeQuerySet(models.QuerySet):
+    """Выборки рецептов для вывода в API."""
 
-    def __str__(self):
-        return f'{self.ingredient}'
+    def with_related(self):
+        """Загружает автора, тэги и ингредиенты без запросов на объект.
 
-    class Meta:
-        verbose_name = 'Кол-во ингредиентов'
-        verbose_name_plural = 'Кол-во ингредиентов'
+        Поисковый вектор и вектор ингредиентов в ответах API не выводятся
+        и не загружаются.
+        """
+        return self.select_related('author').defer(
+            'search_vector', 'ingredient_vector'
+        ).prefetch_related(
+            'tags',
+            models.Prefetch(
+                'ingredient_amounts',
+                queryset=IngredientsAmount.objects.select_related(
+                    'ingredient'
+                )
+            ),
+        )
+
+    def with_user_flags(self, user):
+        """Добавляет признаки избранного, корзины и подписки на автора."""
+        if not user.is_authenticated:
+            false = models.Value(False, output_field=models.BooleanField())
+            return self.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false,
+                is_subscribed_to_author=false,
+            )
+        return self.annotate(
+            is_favorited=models.Exists(Favorite.objects.filter(
+                recipe=models.OuterRef('pk'), user=user
+            )),
+            is_in_shopping_cart=models.Exists(ShoppingCart.objects.filter(
+                recipe=models.OuterRef('pk'), user=user
+            )),
+            is_subscribed_to_author=models.Exists(
+                Subscription.objects.filter(
+                    author=models.OuterRef('author'), user=user
+                )
+            ),
+        )
 
 
-class Recipe(models.Model):
+class Recipe(CounterFieldsMixin, models.Model):
     """Класс рецептов."""
     author = models.ForeignKey(
         User,
@@ -79,10 +105,17 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         null=False,
     )
+    image_renditions = models.JSONField(
+        verbose_name='Варианты картинки',
+        default=dict,
+        editable=False,
+        blank=True
+    )
     text = models.TextField(verbose_name='Текст')
     ingredients = models.ManyToManyField(
-        IngredientsAmount,
-        related_name='ingredients',
+        Ingredient,
+        through='IngredientsAmount',
+        related_name='recipes',
         verbose_name='Ингредиенты'
     )
     tags = models.ManyToManyField(
@@ -98,16 +131,105 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    updated = models.DateTimeField(
+        verbose_name='Дата изменения',
+        default=timezone.now,
+        editable=False,
+        db_index=True
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
+    ingredient_vector = models.JSONField(
+        verbose_name='Вектор ингредиентов',
+        default=list,
+        editable=False,
+        blank=True
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    shopping_cart_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в список покупок',
+        default=0,
+        editable=False
+    )
+
+    objects = RecipeQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('favorites_count', 'shopping_cart_count')
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.updated = timezone.now()
+        super().save(*args, **kwargs)
+
+    def refresh_ingredient_vector(self):
+        """Пересчитывает ingredient_vector по ингредиентам рецепта."""
+        self.ingredient_vector = build_ingredient_vector(
+            IngredientsAmount.objects.filter(recipe=self).values_list(
+                'ingredient_id', 'amount', 'ingredient__measurement_unit'
+            )
+        )
+        Recipe.objects.filter(pk=self.pk).update(
+            ingredient_vector=self.ingredient_vector
+        )
+
     class Meta:
         ordering = ('-created',)
+        indexes = (
+            models.Index(
+                fields=('-created', '-id'), name='recipe_created_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-created', '-id'),
+                name='recipe_author_created_id_idx'
+            ),
+        )
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
 
+class IngredientsAmount(models.Model):
+    """Класс количества ингредиента в рецепте."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='ingredient_amounts',
+        verbose_name='Рецепт'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='ingredient',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveSmallIntegerField(
+        verbose_name='Кол-во',
+        validators=(MinValueValidator(settings.MIN_INGREDIENTS_AMOUNT),),
+        unique=False
+    )
+
+    def __str__(self):
+        return f'{self.ingredient}'
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'ingredient'),
+                name='unique_recipe_ingredient'
+            ),
+        )
+        verbose_name = 'Кол-во ингредиентов'
+        verbose_name_plural = 'Кол-во ингредиентов'
+
+
 class Favorite(models.Model):
     """Класс избранное."""
     user = models.ForeignKey(
@@ -122,6 +244,11 @@ class Favorite(models.Model):
         related_name='favorite_recipe',
         verbose_name='Рецепт'
     )
+    created = models.DateTimeField(
+        verbose_name='Дата добавления',
+        default=timezone.now,
+        db_index=True
+    )
 
     class Meta:
         unique_together = ('user', 'recipe')
@@ -143,8 +270,86 @@ class ShoppingCart(models.Model):
         related_name='recipe_in_shopping_cart',
         verbose_name='Рецепт'
     )
+    created = models.DateTimeField(
+        verbose_name='Дата добавления',
+        default=timezone.now,
+        db_index=True
+    )
 
     class Meta:
         unique_together = ('user', 'recipe')
         verbose_name = 'Список покупок'
         verbose_name_plural = 'Список покупок'
+
+
+class RecipeScore(models.Model):
+    """Класс предрассчитанных оценок популярности рецепта.
+
+    Строка создается вместе с рецептом и перестраивается командой
+    refresh_recipe_scores. Индексы по оценке и рецепту покрывают всю
+    сортировку, поэтому верх рейтинга читается без сортировки рецептов.
+    """
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='score',
+        verbose_name='Рецепт'
+    )
+    popular = models.FloatField(verbose_name='Популярность', default=0)
+    trending = models.FloatField(verbose_name='Популярность сейчас', default=0)
+    updated = models.DateTimeField(
+        verbose_name='Дата расчета',
+        default=timezone.now
+    )
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('-popular', '-recipe'),
+                name='recipe_score_popular_idx'
+            ),
+            models.Index(
+                fields=('-trending', '-recipe'),
+                name='recipe_score_trending_idx'
+            ),
+        )
+        verbose_name = 'Оценка рецепта'
+        verbose_name_plural = 'Оценки рецептов'
+
+
+class RecipeSimilarity(models.Model):
+    """Класс похожих рецептов.
+
+    Строки рассчитываются командой refresh_similar_recipes, индекс по
+    рецепту и оценке позволяет читать список похожих одним запросом.
+    """
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similarities',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(verbose_name='Сходство')
+    computed = models.DateTimeField(verbose_name='Дата расчета')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_recipe_similarity'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('recipe', '-score'), name='recipe_similarity_idx'
+            ),
+        )
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
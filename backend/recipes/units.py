@@ -0,0 +1,23 @@
+UNIT_CONVERSIONS = {
+    'кг': ('г', 1000),
+    'л': ('мл', 1000),
+}
+
+
+def normalize_unit(measurement_unit):
+    """Базовая единица измерения и множитель перевода в нее.
+
+    Единицы, которых нет в UNIT_CONVERSIONS, считаются базовыми.
+    """
+    return UNIT_CONVERSIONS.get(measurement_unit, (measurement_unit, 1))
+
+
+def build_ingredient_vector(amounts):
+    """Вектор ингредиентов рецепта: пары [id, количество в базовой единице].
+
+    amounts - итерируемое из троек (id ингредиента, количество, единица).
+    """
+    return sorted(
+        [ingredient_id, amount * normalize_unit(measurement_unit)[1]]
+        for ingredient_id, amount, measurement_unit in amounts
+    )
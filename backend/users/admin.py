@@ -4,7 +4,8 @@ from users.models import User
 
 
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('pk', 'username', 'email', 'first_name', 'last_name')
+    list_display = ('pk', 'username', 'email', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count')
     list_filter = ('username', 'email')
     empty_value_display = '-пусто-'
 
@@ -0,0 +1,72 @@
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+
+class TokenCacheStats:
+    """Счетчики попаданий в кеш токенов в текущем процессе."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+token_cache_stats = TokenCacheStats()
+
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def get_token_cache_key(key):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f'auth:token:{digest}'
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кешированием токена и пользователя.
+
+    Токен вместе с пользователем хранится в кеше Django с таймаутом
+    TOKEN_CACHE_TIMEOUT, поэтому запросы с известным токеном не обращаются
+    к БД. Запись удаляется при выходе (удалении токена) и при изменении
+    пользователя, в том числе смене пароля и деактивации. Удаление должно
+    быть видно всем воркерам, поэтому с кешем в памяти процесса
+    (LocMemCache) кеширование отключено.
+    """
+
+    def cache_enabled(self):
+        backend = settings.CACHES['default']['BACKEND']
+        return backend not in PROCESS_LOCAL_CACHES
+
+    def authenticate_credentials(self, key):
+        if not self.cache_enabled():
+            return super().authenticate_credentials(key)
+        cache_key = get_token_cache_key(key)
+        token = cache.get(cache_key)
+        token_cache_stats.record(token is not None)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, settings.TOKEN_CACHE_TIMEOUT)
+            return user, token
+        if not token.user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return token.user, token
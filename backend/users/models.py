@@ -2,7 +2,30 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 
 
-class User(AbstractUser):
+class CounterFieldsMixin:
+    """Исключает поля-счетчики из обычного сохранения существующей записи.
+
+    Счетчики меняются только атомарными UPDATE (change_counter) и командой
+    recount, поэтому save() устаревшего экземпляра не должен их затирать.
+    Незагруженные поля тоже не сохраняются, как при обычном save().
+    """
+
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (not self._state.adding and kwargs.get('update_fields') is None
+                and not kwargs.get('force_insert')):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CounterFieldsMixin, AbstractUser):
     """Класс пользователя."""
     email = models.EmailField(unique=True)
     first_name = models.CharField(
@@ -15,6 +38,18 @@ class User(AbstractUser):
         verbose_name='Фамилия',
         blank=False,
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False,
+    )
+
+    COUNTER_FIELDS = ('recipes_count', 'followers_count')
 
 
 class Subscription(models.Model):
@@ -1,11 +1,12 @@
 from re import fullmatch
 from foodgram.settings import RECIPES_LIMIT
+from api.viewer_state import get_viewer_state
 from django.contrib.auth.hashers import make_password
 from django.core.exceptions import ValidationError
 from djoser.serializers import UserSerializer
 from recipes.models import Recipe
 from rest_framework import serializers
-from users.models import Subscription, User
+from users.models import User
 
 
 class CustomUserSerializer(UserSerializer):
@@ -46,11 +47,10 @@ class UserActionGetSerializer(UserSerializer):
                   'is_subscribed')
 
     def get_is_subscribed(self, value):
-        user = self.context['request'].user
-        if user.is_authenticated:
-            subscription = Subscription.objects.filter(author=value, user=user)
-            return subscription.exists()
-        return False  # Если пользователь аноним
+        if hasattr(value, 'is_subscribed'):
+            return value.is_subscribed
+        viewer_state = get_viewer_state(self.context['request'])
+        return viewer_state.is_subscribed(value.pk)
 
 
 class RecipePartInfoSerializer(serializers.ModelSerializer):
@@ -65,7 +65,7 @@ class SubscriptionSerializer(UserActionGetSerializer):
     """Класс получения данных подписок на авторов."""
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField()
 
     class Meta:
         model = User
@@ -73,13 +73,8 @@ class SubscriptionSerializer(UserActionGetSerializer):
                   'is_subscribed', 'recipes', 'recipes_count')
 
     def get_recipes(self, value):
-        serialized_recipes = []
-        recipes = Recipe.objects.filter(author=value)
-        recipes = recipes[:RECIPES_LIMIT]
-        for recipe in recipes:
-            serialized_recipe = RecipePartInfoSerializer(recipe)
-            serialized_recipes.append(serialized_recipe.data)
-        return serialized_recipes
-
-    def get_recipes_count(self, value):
-        return len(Recipe.objects.filter(author=value))
+        if hasattr(value, 'latest_recipes'):
+            recipes = value.latest_recipes
+        else:
+            recipes = Recipe.objects.filter(author=value)[:RECIPES_LIMIT]
+        return RecipePartInfoSerializer(recipes, many=True).data
@@ -0,0 +1,19 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from users.authentication import get_token_cache_key
+from users.models import User
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    cache.delete(get_token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    if created:
+        return
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    cache.delete_many([get_token_cache_key(key) for key in keys])
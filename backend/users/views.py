@@ -1,13 +1,23 @@
+from api.pagination import ForPageNumberPagination
+from api.services import RelationToggle
+from django.db.models import BooleanField, F, Value, Window
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
+from foodgram.settings import RECIPES_LIMIT
+from recipes.models import Recipe
 from rest_framework import status
 from rest_framework.decorators import action
-from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from users.models import Subscription, User
 from users.serializers import (SubscriptionSerializer, UserActionGetSerializer)
 
+SUBSCRIPTION = RelationToggle(
+    Subscription, 'author', 'followers_count', 'subscriptions'
+)
+
 
 class CustomUserViewSet(UserViewSet):
     """Класс регистрации и работы с пользователями и подписками на авторов"""
@@ -21,13 +31,57 @@ class CustomUserViewSet(UserViewSet):
         serializer = UserActionGetSerializer(request.user, context=context)
         return Response(serializer.data)
 
+    def get_recipes_limit(self):
+        recipes_limit = self.request.query_params.get('recipes_limit', '')
+        if recipes_limit.isdigit():
+            return int(recipes_limit)
+        return RECIPES_LIMIT
+
+    def get_subscriptions_queryset(self, user):
+        """Авторы, на которых подписан пользователь."""
+        return User.objects.filter(author__user=user).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('author__id')
+
+    def add_latest_recipes(self, authors):
+        """Загружает последние recipes_limit рецептов авторов страницы.
+
+        Рецепты нумеруются ROW_NUMBER() в пределах автора по индексу
+        (author, -created, -id), поэтому на всю страницу нужен один запрос,
+        который читает только выводимые рецепты.
+        """
+        if not authors:
+            return authors
+        ranked = Recipe.objects.filter(author__in=authors).annotate(
+            row_number=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('created').desc(), F('id').desc()),
+            )
+        ).order_by().values('pk', 'row_number')
+        sql, params = ranked.query.sql_with_params()
+        latest_recipes = Recipe.objects.filter(pk__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) ranked '
+            'WHERE ranked.row_number <= %s',
+            (*params, self.get_recipes_limit()),
+        )).only(
+            'id', 'name', 'image', 'cooking_time', 'author_id'
+        ).order_by('-created', '-id')
+        recipes_by_author = {}
+        for recipe in latest_recipes:
+            recipes_by_author.setdefault(recipe.author_id, []).append(recipe)
+        for author in authors:
+            author.latest_recipes = recipes_by_author.get(author.pk, [])
+        return authors
+
     @action(detail=False, url_path='subscriptions',
             permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
-        authors = User.objects.filter(author__user=request.user)
-        paginator = LimitOffsetPagination()
-        result_pages = paginator.paginate_queryset(queryset=authors,
-                                                   request=request)
+        authors = self.get_subscriptions_queryset(request.user)
+        paginator = ForPageNumberPagination()
+        result_pages = self.add_latest_recipes(
+            paginator.paginate_queryset(queryset=authors, request=request)
+        )
         context = {'request': self.request}
         serializer = SubscriptionSerializer(result_pages, context=context,
                                             many=True)
@@ -42,19 +96,21 @@ class CustomUserViewSet(UserViewSet):
                      'пытаетеcь подписаться на самого себя'),
             'DELETE': 'Вы не подписаны на этого автора',
         }
-        author = get_object_or_404(User, pk=pk)
         user = request.user
-        subscription = Subscription.objects.filter(author=author, user=user)
-        is_subscribed = bool(subscription)
-        if request.method == 'POST' and author != user and not is_subscribed:
-            subscription = Subscription(author=author, user=user)
-            subscription.save()
-            request = self.request
-            context = {'request': request}
-            serializer = SubscriptionSerializer(author, context=context,)
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-        if request.method == 'DELETE' and is_subscribed:
-            subscription.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        if request.method == 'POST':
+            author = get_object_or_404(User, pk=pk)
+            if author != user and SUBSCRIPTION.add(user, author):
+                author = self.get_subscriptions_queryset(user).get(
+                    pk=author.pk
+                )
+                self.add_latest_recipes([author])
+                context = {'request': self.request}
+                serializer = SubscriptionSerializer(author, context=context)
+                return Response(serializer.data,
+                                status=status.HTTP_201_CREATED)
+        if request.method == 'DELETE':
+            if SUBSCRIPTION.remove(user, pk):
+                return Response(status=status.HTTP_204_NO_CONTENT)
+            get_object_or_404(User, pk=pk)
         response = {'errors': response_errors[request.method]}
         return Response(response, status=status.HTTP_400_BAD_REQUEST)